@@ -1,482 +1,944 @@
-import pandapower as pp
-import pandapower.plotting as plot
-import matplotlib.pyplot as plt
-import networkx as nx
-import pandas as pd
-import base64
-import io 
-
-class MASHSG:
-    """Distributed Intelligent System for SelfHealing in Smart Grids"""
-
-    def __init__(
-        self, 
-        net: pp.pandapowerNet = None, 
-        jsonNet: str = None, 
-        debugView : str = None,
-        ):
-        '''
-        Create a Intelligent Agent for Self Healing Grid
-
-        Parameters:
-        :net - pandapowerNet Grid
-        :jsonNet - Json Grid File
-        :debugView
-            :None - disabled,
-            :"Full" - Messages and Switchs
-            :"Messages" - Only Messages
-            :"Switchs" - Only Switchs
-        '''
-
-        # carrega em arquivo circuito dos ramais
-        if (jsonNet is not None) and (net is None):
-            net = pp.from_json(jsonNet)
-        # circuito dos ramais
-        self.net = net 
-        # salva estado anterior das chaves para resetar simulação
-        self.ini_closed = net.switch['closed'].values 
-        # quadro negro de mensagens
-        self.blackboard = []
-        # instante da simulação
-        self.t = 0 
-        # tabelas de informações das chaves, montada no start_simu
-        self.ssw = None 
-        # DebugView
-        self.debugView = debugView
-        # barra com falta
-        self.faultBus = -1
-        # print columns
-        self.__sswColumns = ['name', 'type', 'closed', 'vpu_from', 'vpu_to', 'ika']
-
-    def begin(self) -> None:
-
-        # reiniciando os estados das chaves
-        self.net.switch['closed'] = self.ini_closed
-        net = self.net
-        # objeto de relatório para saída
-        self.report=[]
-
-        # iniciando a tabela de informações das chaves
-        ssw = net.switch[['name','type','closed']]
-        ssw['bus_from'] = net.line.loc[net.switch['element'],'from_bus'].values
-        ssw['bus_to'] = net.line.loc[net.switch['element'],'to_bus'].values
-        ssw['line'] = net.switch['element']
-
-        # == Buscando as chaves vizinhas ==
-        G = pp.topology.create_nxgraph(net,respect_switches=False)
-        grupos_de=[]
-        grupos_para=[]
-        for sw_id, sw in net.switch.iterrows():
-            #Busca em profundidade
-            paths = nx.single_source_shortest_path(G,sw['bus'])
-            # indices das chaves encontradas
-            gd = []
-            gp = []
-            for k in paths:
-                p = paths[k]
-                # analisa caminho para encontra próxima chave
-                dp = False
-                for n in range(len(p)-1):
-                    # informações da aresta (linha)
-                    aresta = list(G[p[n]][p[n+1]].keys())
-                    tipo = aresta[0][0]      
-                    ln_id = aresta[0][1]
-                    # não é chave, é linha
-                    if (tipo != 'line'):
-                        continue  
-                    # não é chave, é o elemento PARA
-                    if (ln_id == sw['element']):
-                        dp=True
-                        continue
-                    # tem chave nesse elemento?
-                    if (ln_id in net.switch['element'].values):
-                        sw_v = net.switch.loc[net.switch['element'] == ln_id].index[0]
-                        # qual é o grupo
-                        if (dp):
-                            if (sw_v not in gp):
-                                gp.append(sw_v)
-                        else:
-                            if (sw_v not in gd):
-                                gd.append(sw_v)
-                        break
-            # convertendo de lista para dicionário
-            grupos_de.append(dict.fromkeys(gd,{}))
-            grupos_para.append(dict.fromkeys(gp,{}))
-            del gd
-            del gp
-        
-        ssw['nb_from'] = grupos_para #time para
-        ssw['nb_to'] = grupos_de #time de
-        
-        ssw['vpu_from'] = [0.0] * len(ssw) #tensão para
-        ssw['vpu_to'] = [0.0] * len(ssw) #tensão de
-
-        ssw['ika'] = [0.0] * len(ssw) #corrente na chave
-        ssw['ika_max'] = [0.0] * len(ssw) #corrente máxima
-        ssw['ika_pre'] = [0.0] * len(ssw) #corrente pré-falta
-        ssw['ika_pos'] = [0.0] * len(ssw) #corrente pós-falta
-        ssw['ika_rem'] = [0.0] * len(ssw) #corrente remanescente
-
-        ssw['locked'] = [False] * len(ssw) #chave travada
-        ssw['over_i'] = [False] * len(ssw) #sobrecorrente
-        ssw['mode'] = [''] * len(ssw) #estado da chave
-
-        self.ssw = ssw
-        # iniciando quadronegro e instante
-        self.blackboard = []
-        self.t=0
-
-    def draw(self, draw_bus_id : bool = False, destination = None) -> None:
-
-        net = self.net
-
-        cores = ['blue','orange','green','red','purple','cyan','pink','olive','cyan']
-
-        collections = []
-
-        collections.append(plot.create_bus_collection(net, net.ext_grid.bus.values, patch_type='rect', size=20, color='pink', zorder=1))
-        collections.append(plot.create_line_collection(net, net.line.index, color='grey', zorder=2))
-        
-        mg = pp.topology.create_nxgraph(net, nogobuses=set(net.trafo.lv_bus.values) | set(net.trafo.hv_bus.values))
-        for c, area in zip(cores, pp.topology.connected_components(mg)):
-            collections.append(plot.create_bus_collection(net, area, size=5, color=c, zorder=3))
-
-        collections.append(plot.create_line_switch_collection(net,size=30,distance_to_bus=40, color='black', zorder=4))
-
-        t = self.t
-        if t > 0:
-            chaves = []
-
-            for id, sw in self.ssw.iterrows():
-                caption = sw['name']
-
-                snd = [x for x in self.blackboard if x['sender'] == id and x['time'] == t]
-                if len(snd) > 0:
-                    caption += '➡'
-
-                rec = [x for x in self.blackboard if x['recipient'] == id and x['time'] == t]
-                if len(rec) > 0:
-                    caption += '⬅'
-
-                if len(sw['mode']) > 0:
-                    caption += '[{0}]'.format(sw['mode'])
-                chaves.append(caption)
-        else:
-            chaves = net.switch['name'].values
-
-        if None not in chaves:
-            bus_id = net.switch['bus']
-            #bus_id = net.bus.iloc[bus_id].index.tolist()
-            coords = zip(net.bus_geodata.x.loc[bus_id].values, net.bus_geodata.y.loc[bus_id].values)
-            collections.append(plot.create_annotation_collection(texts=chaves, coords=coords, size=30, color='grey', zorder=5))
-
-        if draw_bus_id:
-            barras = [str(b) for b in net.bus.index]
-            barCoor = zip(net.bus_geodata.x.values, net.bus_geodata.y.values)
-            collections.append(plot.create_annotation_collection(texts=barras, coords=barCoor, size=20, color='navy', zorder=5))
-        
-        plot.draw_collections(collections)
-        if destination == None:
-            plt.show()
-            return ''
-        elif destination == 'HTML':
-            s = io.BytesIO()
-            plt.savefig(s,  format='png')
-            plt.close()
-            img = base64.b64encode(s.getvalue()).decode("utf-8").replace("\n", "")
-            return '<img src="data:image/png;base64, %s">' % img
-        else:
-            plt.savefig(destination)
-            plt.close()
-            return ''
-    
-    def __str__(self) -> str:
-        return f'SMA=[switchs({self.net.switch.shape[0]}),grids({self.net.ext_grid.shape[0]}),buses({self.net.bus.shape[0]})]'
- 
-    def __pflow(self) -> None:
-        '''PowerFlow'''
-
-        pp.runpp(self.net, neglect_open_switch_branches=True)
-
-    def __level2(self) -> None:
-        '''
-            Level 2 - mensuraments current and tension
-        '''
-        
-        self.ssw['vpu_from'] = self.net.res_bus.loc[self.ssw['bus_from'],'vm_pu'].fillna(0).values
-        self.ssw['vpu_to'] = self.net.res_bus.loc[self.ssw['bus_to'],'vm_pu'].fillna(0).values
-        self.ssw['ika'] = self.net.res_line.loc[self.ssw['line'],'i_ka'].fillna(0).values
-        self.ssw['over_i'] = [ (x[0] < x[1]) for x in self.ssw[ ['ika_max','ika_pos'] ].values ]
-
-    def setFaultBus(
-        self, 
-        faultBus : int, 
-        max_pw : float = 0.08, 
-        pre_pw : float = 0.04,
-        ) -> None:
-        '''
-        Set Fault Bus
-        '''
-
-        # Calculando corrente máxima
-        self.net.load.loc[:,'p_mw'] = max_pw
-        self.net.load.loc[:,'q_mvar'] = max_pw/10
-        self.__pflow()
-        max_ka = self.net.res_line.loc[self.net.switch['element'],'i_ka'].values
-        max_ka = [round(x,2)+0.01 for x in max_ka]
-        self.ssw['ika_max'] = max_ka
-
-        #potência nominal
-        self.net.load.loc[:,'p_mw'] = pre_pw
-        self.net.load.loc[:,'q_mvar'] = pre_pw/10
-        self.__pflow()
-        self.ssw['ika_pre'] = self.net.res_line.loc[self.net.switch['element'],'i_ka'].values
-
-        self.ssw.loc[ (self.ssw['vpu_from'] > 0) & (self.ssw['vpu_to'] > 0) & (self.ssw['closed'] == False), 'locked'] = True
-
-        #remanescente
-        self.ssw['ika_rem'] = max_ka - self.ssw['ika_pre']
-
-        self.__level2()
-        self.report.append('<hr>\r\n')
-        self.report.append('<h1>Start Grid</h1>\r\n')
-
-        if self.debugView == 'Full' or self.debugView == 'Switchs':
-            self.report.append('<h2>Smart Switchs</h2>\r\n')
-            self.report.append(self.ssw[self.__sswColumns].to_html())
-
-        self.report.append(self.draw(draw_bus_id=True, destination='HTML'))
-
-        # injetando CC
-        self.faultBus = faultBus
-        self.net.load.loc[self.net.load['bus'] == faultBus,'p_mw'] = 1.0
-        self.__pflow()
-        self.ssw['ika_pos'] = self.net.res_line.loc[self.net.switch['element'],'i_ka'].values
-
-        self.__level2()
-        self.report.append('<hr>\r\n')
-        self.report.append('<h1>Fault Create</h1>\r\n')
-        self.report.append('<h2>Fault create in bus %s.</h2>\r\n' % faultBus)
-
-        if self.debugView == 'Full' or self.debugView == 'Switchs':
-            self.report.append('<h2>Smart Switchs</h2>\r\n')
-            self.report.append(self.ssw[self.__sswColumns].to_html())
-
-    def __haveMsg(self, id, cmd):
-        ssw = self.ssw
-        ii_to = [p for p in ssw.at[id,'nb_to'] if 'cmd' in ssw.at[id,'nb_to'][p].keys() and ssw.at[id,'nb_to'][p]['cmd'] == cmd]
-        ii_from = [p for p in ssw.at[id,'nb_from'] if 'cmd' in ssw.at[id,'nb_from'][p].keys() and ssw.at[id,'nb_from'][p]['cmd'] == cmd]
-        return (len(ii_to) > 0 or len(ii_from) > 0)
-
-    def step(self) -> bool:
-        ssw = self.ssw
-        net = self.net
-        t = self.t
-        blackboard = self.blackboard
-
-        # listando as chaves
-        for id in ssw.index:
-
-            vizinhos = list(ssw.at[id,'nb_from'].keys()) + list(ssw.at[id,'nb_to'].keys())
-
-            #Nivel 1
-            if ssw.at[id,'over_i'] and ssw.at[id,'mode'] == '':
-
-                if ssw.at[id,'type'] == 'CB' and ssw.at[id,'closed']: #SUBESTACAO
-                    ssw.at[id,'closed'] = False
-                    ssw.at[id,'mode'] = 'SelfHealing'
-
-                    for key in vizinhos:
-                        blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'SearchFault', 'value':''})
-
-            #mensagens recebidas para a chave(id) naquele instante(t)
-            filterMsgs = [m for m in blackboard if m['recipient'] == id and m['time'] == t]
-
-            for msg in filterMsgs:
-
-                # pergunta se tem sobre corrente (pag 70)
-                if msg['cmd'] == 'SearchFault':
-
-                    if ssw.at[id,'mode'] != 'SelfHealing':
-
-                        value = bool(ssw.at[id,'over_i'])
-                        blackboard.append({'time':(t+1), 'sender':id, 'recipient':msg['sender'], 'cmd':'IsFault', 'value':value})
-
-                        if value:
-                            for key in vizinhos:
-                                if msg['sender'] != key:
-                                    blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'SearchFault', 'value':''})
-                
-                if msg['cmd'] == 'AreaIsolate':
-                    
-                    if ssw.at[id,'closed']:
-                        ssw.at[id,'closed'] = False
-                        ssw.at[id,'mode'] = 'IsolateSwitch'
-                    
-                    for key in vizinhos:
-                        blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'IsolateInfo', 'value':''})
-
-                if msg['cmd'] == 'AreaHelp':
-                    
-                    bv_from = bool(ssw.at[id,'vpu_from'] < 0.001)
-                    bv_to = bool(ssw.at[id,'vpu_to'] < 0.001)
-
-                    xorVpu = bv_from ^ bv_to
-                    if ssw.at[id,'mode'] not in ['IsolateSwitch','FaultIsolate']:
-
-                        if xorVpu and not ssw.at[id,'closed']:
-
-                            ssw.at[id,'closed'] = True
-                            ssw.at[id,'mode'] = 'HelpSwitch'
-                        else:
-                            # busca o vizinho que entregou a maior corrente remanescente
-                            for nb in ['nb_to','nb_from']:
-                                if msg['sender'] in ssw.at[id,nb]:
-                                    continue # não reenviar para origem
-                                
-                                gr = ssw.at[id,nb]
-                                if len(gr) == 0:
-                                    continue
-                                
-                                # lista id_chave e corrente dos vizinhos posteiores
-                                ika_rem = { p:gr[p]['value'] for p in gr if gr[p]['cmd'] == 'IkARemai' }
-                                if len(ika_rem) == 0:
-                                    continue
-
-                                key_max = max(ika_rem, key=ika_rem.get) # id da máxima corrente
-                                blackboard.append({'time':(t+1), 'sender':id, 'recipient':key_max, 'cmd':msg['cmd'], 'value':''})
-
-                if msg['cmd'] == 'IsolateInfo':
-
-                    bv_from = bool(ssw.at[id,'vpu_from'] < 0.001)
-                    bv_to = bool(ssw.at[id,'vpu_to'] < 0.001)
-
-                    xorVpu = bv_from ^ bv_to
-
-                    if xorVpu and ssw.at[id,'mode'] == 'SelfHealing':
-                        ssw.at[id,'closed'] = True
-
-                    elif xorVpu and ssw.at[id,'mode'] not in ['IsolateSwitch','FaultIsolate']:
-                        for key in vizinhos:
-                            if msg['sender'] != key:
-                                blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'SearchRemai', 'value':''})
-
-                    else:
-
-                        if not self.__haveMsg(id,'IsolateInfo'):
-                            for key in vizinhos:
-                                if msg['sender'] != key:
-                                    blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'IsolateInfo', 'value':''})
-
-                if msg['cmd'] == 'SearchRemai':
-                    
-                    if ssw.at[id,'mode'] not in ['IsolateSwitch','FaultIsolate']:
-                        if ssw.at[id,'type'] == 'CB' and ssw.at[id,'closed']: #SUBESTACAO
-                            ssw.at[id,'mode'] = 'CheckRemai'
-                            value = ssw.at[id,'ika_rem']
-                            # reenvia ao anteiror a corrente remanescente
-                            blackboard.append({'time':(t+1), 'sender':id, 'recipient':msg['sender'], 'cmd':'IkARemai', 'value':value})
-
-                        else:
-
-                            if not self.__haveMsg(id,'SearchRemai'):
-                                for key in vizinhos:
-                                    if msg['sender'] != key:
-                                        blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'SearchRemai', 'value':''})
-
-                if msg['cmd'] == 'IkARemai':
-                    
-                    if ssw.at[id,'mode'] != 'FaultIsolate':
-
-                        if not self.__haveMsg(id,'IkARemai'):
-                            value = min(ssw.at[id,'ika_rem'], msg['value'])
-
-                            for key in vizinhos:
-                                if msg['sender'] != key:
-                                    blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'IkARemai', 'value':value})
-
-                # salva comando no vizinho que enviou
-                if msg['sender'] in ssw.at[id,'nb_to'].keys():
-                    ssw.at[id,'nb_to'][ msg['sender']] = {'cmd':msg['cmd'], 'value':msg['value']}
-                else:
-                    ssw.at[id,'nb_from'][ msg['sender']] = {'cmd':msg['cmd'], 'value':msg['value']}
-
-                # analisa respostas dos vizinhos
-                for nb in ['nb_to','nb_from']:
-                    gr = ssw.at[id,nb]
-                    num_nb = len(gr.keys())
-                    
-                    if num_nb == 0:
-                        continue
-
-                    # chaves com respostas
-                    resps = [ p for p in gr if len(gr[p].keys()) > 0]
-
-                    if len(resps) < num_nb:
-                        # aguardando respostas
-                        continue
-
-                    # busca da regiao sem falta
-                    num_NoFault = len([ p for p in gr if gr[p]['cmd'] == 'IsFault' and not gr[p]['value'] ])
-                    if num_nb == num_NoFault:
-                        if not ssw.at[id,'locked'] :
-                            # se abre
-                            ssw.at[id,'closed'] = False
-                            ssw.at[id,'mode'] = 'FaultIsolate'
-
-                            for key in gr.keys():
-                                # manda abrir as chaves vizinhas
-                                blackboard.append({'time':(t+1), 'sender':id, 'recipient':key, 'cmd':'AreaIsolate', 'value':''})
-
-                    # religamento da chave de socorro
-                    if ssw.at[id,'mode'] == 'IsolateSwitch':
-                        # qual a maior corrente remanescente
-                        ika_rem = { p:gr[p]['value'] for p in gr if gr[p]['cmd'] == 'IkARemai' }
-
-                        if num_nb == len(ika_rem):
-                            key_maxrem = max(ika_rem, key=ika_rem.get)
-                            blackboard.append({'time':(t+1), 'sender':id, 'recipient':key_maxrem, 'cmd':'AreaHelp', 'value':''})
-
-
-            # repassa comando de fechar ao circuito se não travado
-            if not ssw.at[id,'locked'] and (net.switch.at[id,'closed'] != ssw.at[id,'closed']):
-                net.switch.at[id,'closed'] = ssw.at[id,'closed']
-
-        self.t += 1
-
-        self.__pflow()
-
-        self.__level2()
-
-        swid = {id:sw['name'] for id,sw in ssw.iterrows()}
-        bbt = [{'sender':swid[m['sender']], 'recipient':swid[m['recipient']], 'cmd':m['cmd'], 'value':m['value']}  for m in blackboard if m['time'] == t]
-        bbdf = pd.DataFrame(bbt)
-
-        self.report.append('<p style=\"page-break-before: always\">\r\n')
-        self.report.append('<hr>\r\n')
-        self.report.append(f'<h1>Step {self.t}</h1>\r\n')
-        
-        # exibe tabelas se definido
-        if self.debugView == 'Full' or self.debugView == 'Messages' :
-
-            if len(bbdf) > 0:
-                self.report.append('<h2>Blackboard</h2>\r\n')
-                self.report.append(bbdf.to_html())
-            else:
-                self.report.append('<p>No new messages.</p>\r\n')
-
-        if self.debugView == 'Full' or self.debugView == 'Switchs':
-            self.report.append('<h2>Smart Switchs</h2>\r\n')
-            self.report.append(self.ssw[self.__sswColumns].to_html())
-            
-        self.report.append(self.draw(destination='HTML'))
-
-        return not (self.t > 1 and len(bbdf)==0)
-
-    def to_html(self) -> str:
-        html = ''
-        for line in self.report:
-            html += line + '\r\n'
-        return html
-    def _repr_html_(self):
-        return to_html(self)
\ No newline at end of file
+import pandapower as pp
+import pandas as pd
+import numpy as np
+import io
+from contextlib import nullcontext
+
+from baseline import BaselineCache, net_fingerprint
+from agentstate import (
+    AgentState, MODES, MODE_NONE, MODE_SELFHEALING, MODE_ISOLATESWITCH, MODE_FAULTISOLATE, MODE_HELPSWITCH, MODE_CHECKREMAI,
+    CMD_CODE, CMD_SEARCHFAULT, CMD_ISFAULT, CMD_AREAISOLATE, CMD_ISOLATEINFO, CMD_AREAHELP, CMD_SEARCHREMAI, CMD_IKAREMAI,
+    CMD_NONE,
+)
+from blackboard import Blackboard, MessageArchive
+from eventtrace import EventTrace
+from flowcache import FlowCache
+from floodcontrol import FloodControl
+from gridindex import GridIndex
+from profiler import Profiler
+from radialflow import RadialFlow, RadialFlowError
+from zoneflow import ZoneFlow
+from reportwriter import ReportWriter
+
+class MASHSG:
+    """Distributed Intelligent System for SelfHealing in Smart Grids"""
+
+    def __init__(
+        self, 
+        net: pp.pandapowerNet = None, 
+        jsonNet: str = None, 
+        debugView : str = None,
+        teams : tuple = None,
+        pflowReuse : bool = True,
+        solver : str = 'pandapower',
+        reportWriter : ReportWriter = None,
+        baseline : BaselineCache = None,
+        faultModel : str = 'load',
+        profiler : Profiler = None,
+        cacheNet : str = None,
+        headless : bool = False,
+        zoneFlow : bool = False,
+        flowCache : FlowCache = None,
+        blackboardRetention : int = None,
+        blackboardArchive : str = None,
+        floodControl : FloodControl = None,
+        traceDir : str = None,
+        ):
+        '''
+        Create a Intelligent Agent for Self Healing Grid
+
+        Parameters:
+        :net - pandapowerNet Grid
+        :jsonNet - Json Grid File
+        :debugView
+            :None - disabled,
+            :"Full" - Messages and Switchs
+            :"Messages" - Only Messages
+            :"Switchs" - Only Switchs
+        :teams - neighbor teams (nb_from, nb_to) already computed by neighbor_teams
+        :pflowReuse - skip the power flow when switches and loads did not change
+            and reuse the admittance matrix when only the loads changed
+        :solver
+            :"pandapower" - Newton-Raphson power flow (pp.runpp)
+            :"radial" - backward/forward sweep over the closed switches tree,
+                falls back to pp.runpp when the grid is meshed
+        :reportWriter - write the report while the simulation runs,
+            the trace keeps no frames and to_html returns an empty report
+        :baseline - cache of the pre-fault flows of setFaultBus, shared between
+            agents or stored on disk, default a cache of this agent
+        :faultModel
+            :"load" - fault as a 1 MW load in the fault bus and a power flow
+            :"sc" - three-phase short-circuit currents of pandapower.shortcircuit,
+                computed for all buses at once and kept while the grid does not change
+        :profiler - Profiler of the phases (pflow, level2, rules, draw, report),
+            power flow iterations, messages by command and active switches
+        :cacheNet - binary grid file of netloader.save_cache, loads the grid
+            and its neighbor teams without parsing the Json
+        :headless - never create figures, draw() returns None and the
+            report has no images
+        :zoneFlow - split the grid in feeder zones (ZoneFlow) and solve only
+            the zones whose switches or loads changed
+        :flowCache - FlowCache of the power flow results by switch configuration,
+            loads and fault bus, may be shared between agents. On a hit res_bus
+            and res_line only have vm_pu and i_ka
+        :blackboardRetention - instants of messages kept in memory (at least 2),
+            None to keep all of them. The trace still records every step, set
+            traceDir (or stream the report) to keep the memory flat
+        :blackboardArchive - JSON lines file of the messages out of the retention
+            window, the report reads them from it. Without it they are dropped,
+            to_html() and write_report() raise ValueError and only a streamed
+            report (reportWriter) shows them
+        :floodControl - FloodControl of the flood messages (SearchFault, IsolateInfo,
+            SearchRemai, IkARemai), drops the duplicates and posts the fan-out of a switch
+            as one batched record (len(blackboard) counts the records)
+        :traceDir - directory of the trace records (memory-mapped temporary files),
+            None to keep them in memory
+        '''
+
+        # carrega circuito e times do cache binário
+        if (cacheNet is not None) and (net is None):
+            from netloader import load_cache
+            net, cached = load_cache(cacheNet)
+            if teams is None:
+                teams = cached
+        # carrega em arquivo circuito dos ramais
+        if (jsonNet is not None) and (net is None):
+            net = pp.from_json(jsonNet)
+        # circuito dos ramais
+        self.net = net 
+        # salva estado anterior das chaves para resetar simulação
+        self.ini_closed = net.switch['closed'].values.copy()
+        # quadro negro de mensagens
+        self.blackboardRetention = blackboardRetention
+        self.blackboardArchive = blackboardArchive
+        self.blackboard = self.__newBlackboard()
+        # controle das mensagens propagadas
+        self.floodControl = floodControl
+        # posições de volta dos restore (validam os snapshots)
+        self.__cuts = []
+        # instante da simulação
+        self.t = 0 
+        # times de vizinhos das chaves, calculados uma vez no begin
+        self.teams = teams
+        # estado das chaves (agentes), montado no begin
+        self.agents = None 
+        # posições das chaves, linhas e barras, montadas no begin
+        self.index = None
+        # DebugView
+        self.debugView = debugView
+        # relatório gravado durante a simulação
+        self.reportWriter = reportWriter
+        # registro da simulação para o relatório
+        self.traceDir = traceDir
+        self.trace = EventTrace(keep=reportWriter is None, directory=traceDir)
+        # desenho da rede, montado no primeiro draw
+        self.__renderer = None
+        # sem figuras (processos de simulação)
+        self.headless = headless
+        # barra com falta
+        self.faultBus = -1
+        # reaproveitamento do fluxo de potência
+        self.pflowReuse = pflowReuse
+        # método do fluxo de potência
+        self.solver = solver
+        self.__radial = None
+        self.__pfRecycle = False
+        # fluxo por zonas dos alimentadores
+        self.zoneFlow = zoneFlow
+        self.__zones = None
+        # resultados por configuração das chaves
+        self.flowCache = flowCache
+        self.__fingerprint = None
+        # chaves e cargas do último fluxo de potência
+        self.__pfClosed = None
+        self.__pfLoads = None
+        # fluxos pré-falta já calculados
+        self.baseline = baseline if baseline is not None else BaselineCache()
+        # modelo da falta e correntes de curto de todas as barras
+        self.faultModel = faultModel
+        self.__scKey = None
+        self.__scCurrents = None
+        # medição de tempos e contadores
+        self.profiler = profiler
+
+    def begin(self) -> None:
+
+        # reiniciando os estados das chaves
+        self.net.switch['closed'] = self.ini_closed.copy()
+        net = self.net
+        # registro da simulação para o relatório
+        self.trace = EventTrace(keep=self.reportWriter is None, directory=self.traceDir)
+
+        # == Buscando as chaves vizinhas ==
+        if self.teams is None:
+            from switchteams import neighbor_teams
+            self.teams = neighbor_teams(net)
+        grupos_para, grupos_de = self.teams
+
+        # iniciando o estado das chaves
+        self.agents = AgentState(net, grupos_para, grupos_de)
+        self.index = GridIndex(net)
+        # descarta resultados do fluxo anterior
+        self.__pfClosed = None
+        self.__pfLoads = None
+        # iniciando quadronegro e instante
+        if self.blackboard.archive is not None:
+            self.blackboard.archive.close()
+        self.blackboard = self.__newBlackboard()
+        if self.floodControl is not None:
+            self.floodControl.clear()
+        self.__cuts = []
+        self.t=0
+        self.faultBus = -1
+
+    def __newBlackboard(self) -> Blackboard:
+        '''Empty blackboard with the retention window and archive file'''
+
+        archive = None
+        if self.blackboardArchive is not None:
+            archive = MessageArchive(self.blackboardArchive)
+        return Blackboard(self.blackboardRetention, archive)
+
+    def draw(self, draw_bus_id : bool = False, destination = None) -> str:
+        '''
+        Draw the grid with the current state of the switches
+
+        Parameters:
+        :draw_bus_id - write the bus ids
+        :destination
+            :None - show the figure
+            :"HTML" - return an <img> tag with the figure
+            :file name - save the figure
+
+        Returns None in headless mode
+        '''
+
+        mode = self.agents.mode if self.agents is not None else None
+        return self.__drawFrame(self.t, mode, None, draw_bus_id, destination)
+
+    def __captions(self, t, mode) -> list:
+        '''Caption of each switch at instant t'''
+
+        if t > 0:
+            chaves = []
+
+            ag = self.agents
+            for id, name, md in zip(ag.ids, ag.name, mode):
+                caption = name
+
+                snd = self.blackboard.outbox(t, id)
+                if len(snd) > 0:
+                    caption += '➡'
+
+                rec = self.blackboard.inbox(t, id)
+                if len(rec) > 0:
+                    caption += '⬅'
+
+                if md != MODE_NONE:
+                    caption += '[{0}]'.format(MODES[md])
+                chaves.append(caption)
+        else:
+            chaves = self.net.switch['name'].values
+        return chaves
+
+    def __drawFrame(self, t, mode, net_closed, draw_bus_id, destination) -> str:
+        '''Draw the grid at instant t with the switch modes and grid states given'''
+
+        if self.headless:
+            return None
+
+        net = self.net
+
+        if net_closed is not None:
+            # estado das chaves no quadro desenhado
+            closed_now = net.switch['closed'].values.copy()
+            net.switch['closed'] = net_closed
+            try:
+                return self.__drawFrame(t, mode, None, draw_bus_id, destination)
+            finally:
+                net.switch['closed'] = closed_now
+
+        if self.__renderer is None:
+            # matplotlib e pandapower.plotting só são carregados ao desenhar
+            from gridrenderer import GridRenderer
+            self.__renderer = GridRenderer(net)
+        with self.__phase('draw'):
+            return self.__renderer.frame(self.__captions(t, mode), draw_bus_id, destination)
+
+    def __image(self, t, mode, net_closed, draw_bus_id, jobs, writer = None):
+        '''Image of a frame, or its position in jobs when rendered in parallel'''
+
+        if self.headless:
+            return ''
+
+        # imagem em arquivo externo
+        external = writer.image() if writer is not None else None
+        destination = 'HTML' if external is None else external[0]
+
+        if jobs is None:
+            img = self.__drawFrame(t, mode, net_closed, draw_bus_id, destination)
+        else:
+            jobs.append((net_closed.copy(), self.__captions(t, mode), draw_bus_id, destination))
+            img = len(jobs) - 1
+        return img if external is None else external[1]
+
+    def __record(self, kind, **info) -> None:
+        '''Record a frame in the trace and write it to the streamed report'''
+
+        ag = self.agents
+        blackboard = self.blackboard if kind == 'step' else None
+        frame = self.trace.record(kind, self.t, ag, self.net.switch['closed'].values, blackboard, **info)
+        if self.reportWriter is not None:
+            with self.__phase('report'):
+                self.reportWriter.write(self.__renderFrame(frame, ag.closed, None, ag.mode, writer=self.reportWriter))
+
+    @property
+    def ssw(self) -> pd.DataFrame:
+        '''Switch table built from the agents state'''
+
+        if self.agents is None:
+            return None
+        return self.agents.to_frame()
+
+    def replay(self, t : int) -> pd.DataFrame:
+        '''
+        Switch table (ssw) at instant t rebuilt from the trace
+
+        Parameters:
+        :t - simulation instant (0 is the grid after the fault)
+        '''
+
+        return self.trace.replay(t)
+
+    def __checkArchive(self, what : str) -> None:
+        '''Refuse what when the messages out of the retention window were dropped'''
+
+        if self.blackboardRetention is not None and self.blackboardArchive is None:
+            raise ValueError(f'{what} reads the messages out of the retention window, set blackboardArchive')
+
+    def snapshot(self) -> dict:
+        '''
+        Save the simulation state to branch from it with restore()
+
+        The switch states, agent modes and neighbor messages, the blackboard
+        and trace positions, the flood control state and the last power flow
+        results are kept. The grid itself is not copied.
+
+        With a blackboard retention window the snapshot can be restored only
+        while the messages posted after it are still in the window, about
+        blackboardRetention steps.
+
+        Returns:
+        :dict with the state
+        '''
+
+        net = self.net
+        return {
+            't':self.t,
+            'faultBus':self.faultBus,
+            'agents':self.agents,
+            'state':self.agents.save(),
+            'net_closed':net.switch['closed'].values.astype(bool),
+            'loads':(net.load['p_mw'].values.copy(), net.load['q_mvar'].values.copy()),
+            'res':{key:(net[key].values.copy(), net[key].index, net[key].columns) for key in ('res_bus', 'res_line')},
+            'pf':(self.__pfClosed, self.__pfLoads),
+            'blackboard':(self.blackboard, len(self.blackboard)),
+            'trace':(self.trace, self.trace.mark()),
+            'cuts':(self.__cuts, len(self.__cuts)),
+            'flood':self.floodControl.save() if self.floodControl is not None else None,
+            }
+
+    def restore(self, snap : dict) -> None:
+        '''
+        Go back to a state of snapshot()
+
+        The same snapshot may be restored many times. A snapshot taken after
+        an older one that was restored later belongs to a discarded branch
+        and is refused. A streamed report (reportWriter) is not rewound.
+
+        Raises ValueError for a snapshot of a discarded branch or whose later
+        messages already left the blackboard retention window.
+
+        Parameters:
+        :snap - state returned by snapshot()
+        '''
+
+        cuts, n_cuts = snap['cuts']
+        pos = (snap['blackboard'][1], snap['trace'][1][0])
+        if any(c[0] < pos[0] or c[1] < pos[1] for c in cuts[n_cuts:]):
+            raise ValueError(f'snapshot of t={snap["t"]} belongs to a discarded branch')
+
+        self.blackboard, n = snap['blackboard']
+        self.blackboard.rewind(n)
+        self.trace, mark = snap['trace']
+        self.trace.rewind(mark)
+        self.__cuts = cuts
+        cuts.append(pos)
+
+        self.agents = snap['agents']
+        self.agents.load(snap['state'])
+        self.t = snap['t']
+        self.faultBus = snap['faultBus']
+
+        net = self.net
+        net.switch['closed'] = snap['net_closed'].copy()
+        net.load['p_mw'] = snap['loads'][0].copy()
+        net.load['q_mvar'] = snap['loads'][1].copy()
+        for key, (values, index, columns) in snap['res'].items():
+            net[key] = pd.DataFrame(values.copy(), index=index, columns=columns)
+        self.__pfClosed, self.__pfLoads = snap['pf']
+        if self.floodControl is not None and snap['flood'] is not None:
+            self.floodControl.load(snap['flood'])
+        # as tabelas internas do pandapower não são deste estado
+        self.__pfRecycle = False
+
+    def __str__(self) -> str:
+        return f'SMA=[switchs({self.net.switch.shape[0]}),grids({self.net.ext_grid.shape[0]}),buses({self.net.bus.shape[0]})]'
+ 
+    def __phase(self, name):
+        '''Profiler phase, or a context that does nothing'''
+
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
+
+    def __pflow(self) -> None:
+        '''PowerFlow'''
+
+        if self.profiler is None:
+            self.__solve()
+            return
+
+        with self.profiler.phase('pflow'):
+            how = self.__solve()
+        self.profiler.count('pflow_' + how)
+        if how == 'zones':
+            self.profiler.count('zones_solved', self.__zones.solved)
+        elif how == 'radial':
+            self.profiler.count('pflow_iterations', self.__radial.iterations)
+        elif how not in ('skipped', 'cached'):
+            self.profiler.count('pflow_iterations', int(self.net._ppc['iterations']))
+
+    def __solve(self) -> str:
+        '''Solve the power flow, returns skipped, cached, zones, radial, recycled or cold'''
+
+        net = self.net
+
+        closed = net.switch['closed'].values.astype(bool)
+        loads = np.concatenate((net.load['p_mw'].values, net.load['q_mvar'].values))
+        same_topo = self.__pfClosed is not None and np.array_equal(closed, self.__pfClosed)
+
+        if self.pflowReuse and same_topo and np.array_equal(loads, self.__pfLoads):
+            # nada mudou, mantém os resultados anteriores
+            return 'skipped'
+
+        if self.flowCache is None:
+            return self.__compute(closed, loads, same_topo)
+
+        # configuração já resolvida
+        if self.__fingerprint is None:
+            self.__fingerprint = net_fingerprint(net)
+        # no modelo sc a falta não entra no fluxo de potência
+        faultBus = self.faultBus if self.faultModel == 'load' else -1
+        key = FlowCache.key(self.__fingerprint, self.solver, closed, loads, faultBus)
+        res = self.flowCache.get(key)
+        if res is not None:
+            net['res_bus'] = pd.DataFrame({'vm_pu':res['vm_pu']}, index=net.bus.index)
+            net['res_line'] = pd.DataFrame({'i_ka':res['i_ka']}, index=net.line.index)
+            self.__pfRecycle = False
+            self.__pfClosed = closed
+            self.__pfLoads = loads
+            return 'cached'
+
+        how = self.__compute(closed, loads, same_topo)
+        self.flowCache.put(key, net.res_bus['vm_pu'].values, net.res_line['i_ka'].values)
+        return how
+
+    def __compute(self, closed, loads, same_topo) -> str:
+        '''Solve the power flow of the switches and loads given'''
+
+        net = self.net
+
+        if self.zoneFlow:
+            if self.__zones is None:
+                # interligações: chaves abertas no início
+                self.__zones = ZoneFlow(net, self.solver, np.flatnonzero(~self.ini_closed.astype(bool)))
+            self.__zones.run(net)
+            self.__pfRecycle = False
+            self.__pfClosed = closed
+            self.__pfLoads = loads
+            return 'zones'
+
+        solved = False
+        if self.solver == 'radial':
+            try:
+                if self.__radial is None:
+                    self.__radial = RadialFlow(net)
+                self.__radial.run(net)
+                solved = True
+            except RadialFlowError:
+                # rede malhada ou elemento não suportado, resolve pelo pandapower
+                pass
+
+        if solved:
+            self.__pfRecycle = False
+            how = 'radial'
+        elif self.pflowReuse and same_topo and self.__pfRecycle:
+            # mesma topologia, reaproveita Ybus e tabelas internas (ppc)
+            pp.runpp(net, neglect_open_switch_branches=True, recycle={'bus_pq':True, 'trafo':False, 'gen':False})
+            how = 'recycled'
+        else:
+            # topologia nova, as barras reenergizadas não têm solução anterior
+            pp.runpp(net, neglect_open_switch_branches=True)
+            self.__pfRecycle = True
+            how = 'cold'
+
+        self.__pfClosed = closed
+        self.__pfLoads = loads
+        return how
+
+    def __pfSolved(self) -> None:
+        '''Results of the current switches and loads set from outside the power flow'''
+
+        self.__pfClosed = self.net.switch['closed'].values.astype(bool)
+        self.__pfLoads = np.concatenate((self.net.load['p_mw'].values, self.net.load['q_mvar'].values))
+        # as tabelas internas do pandapower não são deste estado
+        self.__pfRecycle = False
+
+    def __level2(self) -> None:
+        '''
+            Level 2 - mensuraments current and tension
+        '''
+        
+        with self.__phase('level2'):
+            ag = self.agents
+            ag.vpu_from[:], ag.vpu_to[:] = self.index.bus_values(self.net, 'vm_pu', fill=0)
+            ag.ika[:] = self.index.line_values(self.net, 'i_ka', fill=0)
+            ag.over_i[:] = ag.ika_max < ag.ika_pos
+
+    def setFaultBus(
+        self, 
+        faultBus : int, 
+        max_pw : float = 0.08, 
+        pre_pw : float = 0.04,
+        ) -> None:
+        '''
+        Set Fault Bus
+        '''
+
+        ag = self.agents
+        fingerprint = net_fingerprint(self.net)
+        self.__fingerprint = fingerprint
+        key = BaselineCache.key(fingerprint, max_pw, pre_pw, self.solver)
+        base = self.baseline.get(key)
+
+        if base is None:
+            # Calculando corrente máxima
+            self.net.load.loc[:,'p_mw'] = max_pw
+            self.net.load.loc[:,'q_mvar'] = max_pw/10
+            self.__pflow()
+            max_ka = self.index.line_values(self.net)
+            max_ka = np.array([round(x,2)+0.01 for x in max_ka])
+            ag.ika_max[:] = max_ka
+
+            #potência nominal
+            self.net.load.loc[:,'p_mw'] = pre_pw
+            self.net.load.loc[:,'q_mvar'] = pre_pw/10
+            self.__pflow()
+            ag.ika_pre[:] = self.index.line_values(self.net)
+
+            self.baseline.put(key, ag.ika_max, ag.ika_pre, self.net.res_bus, self.net.res_line)
+        else:
+            # fluxos pré-falta do cache, só as cargas nominais são repostas
+            max_ka = base['ika_max']
+            ag.ika_max[:] = max_ka
+            ag.ika_pre[:] = base['ika_pre']
+            self.net.load.loc[:,'p_mw'] = pre_pw
+            self.net.load.loc[:,'q_mvar'] = pre_pw/10
+            self.net['res_bus'] = base['res_bus'].copy()
+            self.net['res_line'] = base['res_line'].copy()
+            self.__pfSolved()
+
+        ag.locked[ (ag.vpu_from > 0) & (ag.vpu_to > 0) & (ag.closed == False) ] = True
+
+        #remanescente
+        ag.ika_rem[:] = max_ka - ag.ika_pre
+
+        self.__level2()
+        self.__record('start')
+
+        # injetando CC
+        self.faultBus = faultBus
+        if self.faultModel == 'sc':
+            # correntes de curto calculadas uma vez para todas as barras
+            if self.__scKey != fingerprint:
+                from faultmatrix import sc_fault_currents
+                self.__scCurrents = sc_fault_currents(self.net)
+                self.__scKey = fingerprint
+            ag.ika_pos[:] = self.__scCurrents[faultBus].values
+        else:
+            self.net.load.loc[self.net.load['bus'] == faultBus,'p_mw'] = 1.0
+            self.__pflow()
+            ag.ika_pos[:] = self.index.line_values(self.net)
+
+        self.__level2()
+        self.__record('fault', faultBus=faultBus)
+        if self.profiler is not None:
+            self.profiler.end_step(self.t)
+
+    def agentRules(self, i : int, msgs : list, send) -> None:
+        '''
+        Rules of one switch agent (levels 1 and 3) for the messages received
+
+        Parameters:
+        :i - switch position (in net.switch)
+        :msgs - messages received (dicts with sender, recipient, cmd and value)
+        :send - function send(sender, recipient, cmd, value='') that delivers a message
+        '''
+
+        ag = self.agents
+        ids = ag.ids
+        mode = ag.mode
+        closed = ag.closed
+
+        id = ids[i]
+        vizinhos = ids[ag.neighbors(i)]
+
+        #Nivel 1
+        if ag.over_i[i] and mode[i] == MODE_NONE:
+
+            if ag.is_cb[i] and closed[i]: #SUBESTACAO
+                closed[i] = False
+                mode[i] = MODE_SELFHEALING
+
+                for key in vizinhos:
+                    send(id, key, 'SearchFault')
+
+        for msg in msgs:
+
+            cmd = CMD_CODE[msg['cmd']]
+
+            # pergunta se tem sobre corrente (pag 70)
+            if cmd == CMD_SEARCHFAULT:
+
+                if mode[i] != MODE_SELFHEALING:
+
+                    value = bool(ag.over_i[i])
+                    send(id, msg['sender'], 'IsFault', value)
+
+                    if value:
+                        for key in vizinhos:
+                            if msg['sender'] != key:
+                                send(id, key, 'SearchFault')
+            
+            if cmd == CMD_AREAISOLATE:
+                
+                if closed[i]:
+                    closed[i] = False
+                    mode[i] = MODE_ISOLATESWITCH
+                
+                for key in vizinhos:
+                    send(id, key, 'IsolateInfo')
+
+            if cmd == CMD_AREAHELP:
+                
+                bv_from = bool(ag.vpu_from[i] < 0.001)
+                bv_to = bool(ag.vpu_to[i] < 0.001)
+
+                xorVpu = bv_from ^ bv_to
+                if mode[i] not in (MODE_ISOLATESWITCH, MODE_FAULTISOLATE):
+
+                    if xorVpu and not closed[i]:
+
+                        closed[i] = True
+                        mode[i] = MODE_HELPSWITCH
+                    else:
+                        # busca o vizinho que entregou a maior corrente remanescente
+                        for gr in ag.teams(i):
+                            if msg['sender'] in ids[ag.nb_idx[gr]]:
+                                continue # não reenviar para origem
+                            
+                            # lista id_chave e corrente dos vizinhos posteiores
+                            rem = (ag.nb_cmd[gr] == CMD_IKAREMAI)
+                            if not rem.any():
+                                continue
+
+                            ika_rem = ag.nb_val[gr][rem]
+                            key_max = ids[ag.nb_idx[gr][rem][ika_rem.argmax()]] # id da máxima corrente
+                            send(id, key_max, msg['cmd'])
+
+            if cmd == CMD_ISOLATEINFO:
+
+                bv_from = bool(ag.vpu_from[i] < 0.001)
+                bv_to = bool(ag.vpu_to[i] < 0.001)
+
+                xorVpu = bv_from ^ bv_to
+
+                if xorVpu and mode[i] == MODE_SELFHEALING:
+                    closed[i] = True
+
+                elif xorVpu and mode[i] not in (MODE_ISOLATESWITCH, MODE_FAULTISOLATE):
+                    for key in vizinhos:
+                        if msg['sender'] != key:
+                            send(id, key, 'SearchRemai')
+
+                else:
+
+                    if not ag.have_msg(i, CMD_ISOLATEINFO):
+                        for key in vizinhos:
+                            if msg['sender'] != key:
+                                send(id, key, 'IsolateInfo')
+
+            if cmd == CMD_SEARCHREMAI:
+                
+                if mode[i] not in (MODE_ISOLATESWITCH, MODE_FAULTISOLATE):
+                    if ag.is_cb[i] and closed[i]: #SUBESTACAO
+                        mode[i] = MODE_CHECKREMAI
+                        value = float(ag.ika_rem[i])
+                        # reenvia ao anteiror a corrente remanescente
+                        send(id, msg['sender'], 'IkARemai', value)
+
+                    else:
+
+                        if not ag.have_msg(i, CMD_SEARCHREMAI):
+                            for key in vizinhos:
+                                if msg['sender'] != key:
+                                    send(id, key, 'SearchRemai')
+
+            if cmd == CMD_IKAREMAI:
+                
+                if mode[i] != MODE_FAULTISOLATE:
+
+                    if not ag.have_msg(i, CMD_IKAREMAI):
+                        value = min(float(ag.ika_rem[i]), msg['value'])
+
+                        for key in vizinhos:
+                            if msg['sender'] != key:
+                                send(id, key, 'IkARemai', value)
+
+            # salva comando no vizinho que enviou
+            ag.receive(i, ag.pos[msg['sender']], cmd, 0.0 if msg['value'] == '' else msg['value'])
+
+            # analisa respostas dos vizinhos
+            for gr in ag.teams(i):
+                cmds = ag.nb_cmd[gr]
+                num_nb = len(cmds)
+                
+                if num_nb == 0:
+                    continue
+
+                if (cmds == CMD_NONE).any():
+                    # aguardando respostas
+                    continue
+
+                # busca da regiao sem falta
+                num_NoFault = ((cmds == CMD_ISFAULT) & (ag.nb_val[gr] == 0)).sum()
+                if num_nb == num_NoFault:
+                    if not ag.locked[i] :
+                        # se abre
+                        closed[i] = False
+                        mode[i] = MODE_FAULTISOLATE
+
+                        for key in ids[ag.nb_idx[gr]]:
+                            # manda abrir as chaves vizinhas
+                            send(id, key, 'AreaIsolate')
+
+                # religamento da chave de socorro
+                if mode[i] == MODE_ISOLATESWITCH:
+                    # qual a maior corrente remanescente
+                    rem = (cmds == CMD_IKAREMAI)
+
+                    if rem.all():
+                        key_maxrem = ids[ag.nb_idx[gr][ag.nb_val[gr].argmax()]]
+                        send(id, key_maxrem, 'AreaHelp')
+
+    def updateGrid(self) -> None:
+        '''Send the switch states of the agents to the grid (if not locked), solve the power flow and read the measurements'''
+
+        ag = self.agents
+        net = self.net
+
+        # repassa comando de fechar ao circuito se não travado
+        net_closed = net.switch['closed'].values.astype(bool)
+        changed = ~ag.locked & (net_closed != ag.closed)
+        if changed.any():
+            pos = np.flatnonzero(changed)
+            self.index.set_closed(net, pos, ag.closed[pos])
+
+        self.__pflow()
+
+        self.__level2()
+
+    def step(self) -> bool:
+        ag = self.agents
+        t = self.t
+        blackboard = self.blackboard
+        ids = ag.ids
+        flood = self.floodControl
+
+        if flood is None:
+            def send(sender, recipient, cmd, value = ''):
+                blackboard.post(t+1, sender, recipient, cmd, value)
+        else:
+            def send(sender, recipient, cmd, value = ''):
+                flood.send(t+1, sender, recipient, cmd, value)
+
+        # chaves ativas: com mensagens no instante ou disjuntor com sobrecorrente
+        # (cada chave só altera o próprio estado, as demais não têm o que fazer)
+        active = {ag.pos[m['recipient']] for m in blackboard.at(t)}
+        active.update(np.flatnonzero(ag.over_i & (ag.mode == MODE_NONE) & ag.is_cb & ag.closed).tolist())
+
+        # listando as chaves ativas, na ordem das chaves
+        with self.__phase('rules'):
+            for i in sorted(active):
+                msgs = blackboard.inbox(t, ids[i])
+                if flood is not None:
+                    flood.receive(msgs)
+                self.agentRules(i, msgs, send)
+            if flood is not None:
+                flood.flush(blackboard)
+
+        self.t += 1
+
+        self.updateGrid()
+
+        self.__record('step')
+
+        if self.profiler is not None:
+            self.profiler.count('active_switches', len(active))
+            for msg in blackboard.at(self.t):
+                self.profiler.count('msg_' + msg['cmd'])
+            self.profiler.end_step(self.t)
+
+        return not (self.t > 1 and len(blackboard.at(t))==0)
+
+
+    def __renderFrame(self, frame, closed, net_closed, mode, jobs = None, writer = None) -> list:
+        '''HTML of one frame of the simulation trace'''
+
+        ag = self.agents
+        report = []
+
+        # tabela das chaves no quadro
+        vpu_from, vpu_to, ika = frame['meas']
+        sswdf = pd.DataFrame({'name':ag.name, 'type':ag.type, 'closed':closed, 'vpu_from':vpu_from, 'vpu_to':vpu_to, 'ika':ika}, index=ag.ids)
+        showSwitchs = self.debugView == 'Full' or self.debugView == 'Switchs'
+
+        if frame['kind'] == 'start':
+            report.append('<hr>\r\n')
+            report.append('<h1>Start Grid</h1>\r\n')
+
+            if showSwitchs:
+                report.append('<h2>Smart Switchs</h2>\r\n')
+                report.append(sswdf.to_html())
+
+            report.append(self.__image(frame['t'], mode, net_closed, True, jobs, writer))
+
+        elif frame['kind'] == 'fault':
+            report.append('<hr>\r\n')
+            report.append('<h1>Fault Create</h1>\r\n')
+            report.append('<h2>Fault create in bus %s.</h2>\r\n' % frame['faultBus'])
+
+            if showSwitchs:
+                report.append('<h2>Smart Switchs</h2>\r\n')
+                report.append(sswdf.to_html())
+
+        else:
+            t = frame['t']
+            swid = dict(zip(ag.ids, ag.name))
+            bbt = [{'sender':swid[m['sender']], 'recipient':swid[m['recipient']], 'cmd':m['cmd'], 'value':m['value']}  for m in self.blackboard.at(t-1)]
+            bbdf = pd.DataFrame(bbt)
+
+            report.append('<p style=\"page-break-before: always\">\r\n')
+            report.append('<hr>\r\n')
+            report.append(f'<h1>Step {t}</h1>\r\n')
+            
+            # exibe tabelas se definido
+            if self.debugView == 'Full' or self.debugView == 'Messages' :
+
+                if len(bbdf) > 0:
+                    report.append('<h2>Blackboard</h2>\r\n')
+                    report.append(bbdf.to_html())
+                else:
+                    report.append('<p>No new messages.</p>\r\n')
+
+            if showSwitchs:
+                report.append('<h2>Smart Switchs</h2>\r\n')
+                report.append(sswdf.to_html())
+                
+            report.append(self.__image(t, mode, net_closed, False, jobs, writer))
+
+        return report
+
+    def write_report(self, target, imageDir : str = None, steps = None, processes : int = None) -> None:
+        '''
+        Write the report of the simulation trace frame by frame
+
+        Parameters:
+        :target - file name, file-like object or ReportWriter
+        :imageDir - directory of the PNG images, None to embed them in the HTML
+        :steps - steps to render (0 for start grid and fault), default all
+        :processes - number of worker processes to draw the images, default in this process
+        '''
+
+        # as tabelas e legendas leem as mensagens do quadro negro
+        if self.trace.keep and (not self.headless or self.debugView in ('Full', 'Messages')):
+            self.__checkArchive('the report')
+
+        if isinstance(target, ReportWriter):
+            writer = target
+        else:
+            writer = ReportWriter(target, imageDir)
+
+        if steps is not None:
+            steps = set(steps)
+
+        # imagens desenhadas em paralelo, em blocos de quadros
+        pool = None
+        jobs = None
+        if processes is not None and processes > 1 and not self.headless:
+            from gridrenderer import frame_pool, render_frames
+            pool = frame_pool(self.net, processes)
+            jobs = []
+        pending = []
+
+        def flush():
+            imgs = render_frames(self.net, jobs, processes, pool)
+            for lines in pending:
+                writer.write([imgs[line] if isinstance(line, int) else line for line in lines])
+            jobs.clear()
+            pending.clear()
+
+        try:
+            with self.__phase('report'):
+                for frame, closed, net_closed, mode in self.trace.iter_frames():
+                    if steps is not None and frame['t'] not in steps:
+                        continue
+                    lines = self.__renderFrame(frame, closed, net_closed, mode, jobs, writer)
+                    if jobs is None:
+                        writer.write(lines)
+                        continue
+                    pending.append(lines)
+                    if len(jobs) >= processes * 4:
+                        flush()
+                if pending:
+                    flush()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if writer is not target:
+                writer.close()
+
+    def to_html(self, steps = None, processes : int = None) -> str:
+        '''
+        Render the report of the simulation from the trace
+
+        Parameters:
+        :steps - steps to render (0 for start grid and fault), default all
+        :processes - number of worker processes to draw the images, default in this process
+        '''
+
+        s = io.StringIO(newline='')
+        self.write_report(s, steps=steps, processes=processes)
+        return s.getvalue()
+
+    def _repr_html_(self):
+        return self.to_html()
\ No newline at end of file
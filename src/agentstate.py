@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+# estados (modos) das chaves
+MODES = ['', 'SelfHealing', 'IsolateSwitch', 'FaultIsolate', 'HelpSwitch', 'CheckRemai']
+MODE_NONE, MODE_SELFHEALING, MODE_ISOLATESWITCH, MODE_FAULTISOLATE, MODE_HELPSWITCH, MODE_CHECKREMAI = range(len(MODES))
+
+# comandos trocados entre as chaves
+CMDS = ['SearchFault', 'IsFault', 'AreaIsolate', 'IsolateInfo', 'AreaHelp', 'SearchRemai', 'IkARemai']
+CMD_SEARCHFAULT, CMD_ISFAULT, CMD_AREAISOLATE, CMD_ISOLATEINFO, CMD_AREAHELP, CMD_SEARCHREMAI, CMD_IKAREMAI = range(len(CMDS))
+CMD_CODE = {cmd:n for n, cmd in enumerate(CMDS)}
+# vizinho sem mensagem recebida
+CMD_NONE = -1
+
+# atributos fixos das chaves, que não mudam na simulação
+STATIC = ('ids', 'name', 'type', 'line', 'bus_from', 'bus_to', 'nb_ptr', 'nb_mid', 'nb_idx')
+# atributos que mudam na simulação (salvos por save)
+DYNAMIC = (
+    'closed', 'vpu_from', 'vpu_to', 'ika', 'ika_max', 'ika_pre', 'ika_pos', 'ika_rem', 'locked', 'over_i', 'mode', 'nb_cmd', 'nb_val',
+    )
+
+
+class AgentState:
+    '''
+    Columnar state of the switch agents
+
+    Every attribute of a switch is a typed NumPy array indexed by the
+    switch position in net.switch. Modes and commands are integer coded
+    (MODES and CMDS) and the neighbor teams are stored as a CSR table:
+    the row of switch i is nb_idx[nb_ptr[i]:nb_ptr[i+1]], with the team
+    PARA (nb_from) before nb_mid[i] and the team DE (nb_to) after it.
+    '''
+
+    def __init__(self, net, nb_from: list, nb_to: list):
+        '''
+        Create the state of the switch agents
+
+        Parameters:
+        :net - pandapowerNet Grid
+        :nb_from - list (aligned with net.switch) of switch ids after the own line
+        :nb_to - list (aligned with net.switch) of switch ids before the own line
+        '''
+
+        sw = net.switch
+        # id (rótulo) e posição das chaves
+        self.ids = sw.index.values
+        self.pos = {id:i for i, id in enumerate(self.ids)}
+
+        self.name = sw['name'].values
+        self.type = sw['type'].values
+        self.is_cb = (self.type == 'CB')
+        self.closed = sw['closed'].values.astype(bool)
+        self.line = sw['element'].values.astype(np.int64)
+        self.bus_from = net.line.loc[self.line,'from_bus'].values.astype(np.int64)
+        self.bus_to = net.line.loc[self.line,'to_bus'].values.astype(np.int64)
+
+        # == Tabela CSR dos vizinhos ==
+        ptr = [0]
+        mid = []
+        idx = []
+        for gp, gd in zip(nb_from, nb_to):
+            idx.extend(self.pos[k] for k in gp)
+            mid.append(len(idx))
+            idx.extend(self.pos[k] for k in gd)
+            ptr.append(len(idx))
+        self.nb_ptr = np.array(ptr, dtype=np.int64)
+        self.nb_mid = np.array(mid, dtype=np.int64)
+        self.nb_idx = np.array(idx, dtype=np.int64)
+
+        self.__init_state()
+
+    @classmethod
+    def from_static(cls, static: dict) -> 'AgentState':
+        '''
+        Create the state of the switch agents from the fixed attributes
+
+        Parameters:
+        :static - dict with the STATIC arrays (see static())
+        '''
+
+        ag = cls.__new__(cls)
+        for key in STATIC:
+            setattr(ag, key, np.asarray(static[key]))
+        ag.pos = {id:i for i, id in enumerate(ag.ids)}
+        ag.is_cb = (ag.type == 'CB')
+        ag.closed = np.zeros(len(ag.ids), dtype=bool)
+        ag.__init_state()
+        return ag
+
+    def static(self) -> dict:
+        '''Fixed attributes of the switches (STATIC), enough to rebuild the agents'''
+
+        return {key:getattr(self, key) for key in STATIC}
+
+    def save(self) -> dict:
+        '''Copy of the changing attributes of the switches (DYNAMIC)'''
+
+        return {key:getattr(self, key).copy() for key in DYNAMIC}
+
+    def load(self, state: dict) -> None:
+        '''
+        Set the changing attributes saved by save(), in place
+
+        Parameters:
+        :state - dict with the DYNAMIC arrays
+        '''
+
+        for key in DYNAMIC:
+            np.copyto(getattr(self, key), state[key])
+
+    def __init_state(self) -> None:
+        '''Measurements, modes and messages of the switches'''
+
+        n = len(self.ids)
+        self.vpu_from = np.zeros(n) #tensão para
+        self.vpu_to = np.zeros(n) #tensão de
+
+        self.ika = np.zeros(n) #corrente na chave
+        self.ika_max = np.zeros(n) #corrente máxima
+        self.ika_pre = np.zeros(n) #corrente pré-falta
+        self.ika_pos = np.zeros(n) #corrente pós-falta
+        self.ika_rem = np.zeros(n) #corrente remanescente
+
+        self.locked = np.zeros(n, dtype=bool) #chave travada
+        self.over_i = np.zeros(n, dtype=bool) #sobrecorrente
+        self.mode = np.zeros(n, dtype=np.int8) #estado da chave
+
+        # última mensagem recebida de cada vizinho
+        idx = self.nb_idx
+        self.nb_cmd = np.full(len(idx), CMD_NONE, dtype=np.int8)
+        self.nb_val = np.zeros(len(idx))
+
+        # posição do vizinho na linha da chave, o time DE tem prioridade
+        self.slot = {}
+        for i in range(n):
+            for k in range(self.nb_mid[i], self.nb_ptr[i+1]):
+                self.slot.setdefault((i, int(idx[k])), k)
+            for k in range(self.nb_ptr[i], self.nb_mid[i]):
+                self.slot.setdefault((i, int(idx[k])), k)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def neighbors(self, i: int) -> np.ndarray:
+        '''Positions of the neighbors of switch i (team PARA, then team DE)'''
+
+        return self.nb_idx[self.nb_ptr[i]:self.nb_ptr[i+1]]
+
+    def teams(self, i: int) -> tuple:
+        '''Slices of the teams DE (nb_to) and PARA (nb_from) of switch i'''
+
+        return (slice(self.nb_mid[i], self.nb_ptr[i+1]), slice(self.nb_ptr[i], self.nb_mid[i]))
+
+    def receive(self, i: int, sender: int, cmd: int, value: float) -> None:
+        '''Save the last command received by switch i from the neighbor sender'''
+
+        k = self.slot.get((i, sender))
+        if k is not None:
+            self.nb_cmd[k] = cmd
+            self.nb_val[k] = value
+
+    def have_msg(self, i: int, cmd: int) -> bool:
+        '''True if some neighbor of switch i sent the command cmd'''
+
+        return bool((self.nb_cmd[self.nb_ptr[i]:self.nb_ptr[i+1]] == cmd).any())
+
+    def __nb_dict(self, k0: int, k1: int) -> dict:
+        gr = {}
+        for k in range(k0, k1):
+            cmd = self.nb_cmd[k]
+            if cmd == CMD_NONE:
+                msg = {}
+            elif cmd == CMD_ISFAULT:
+                msg = {'cmd':CMDS[cmd], 'value':bool(self.nb_val[k])}
+            elif cmd == CMD_IKAREMAI:
+                msg = {'cmd':CMDS[cmd], 'value':float(self.nb_val[k])}
+            else:
+                msg = {'cmd':CMDS[cmd], 'value':''}
+            gr[self.ids[self.nb_idx[k]]] = msg
+        return gr
+
+    def to_frame(self) -> pd.DataFrame:
+        '''Build the switch table (ssw) from the state arrays'''
+
+        n = len(self.ids)
+        ssw = pd.DataFrame({
+            'name':self.name,
+            'type':self.type,
+            'closed':self.closed.copy(),
+            'bus_from':self.bus_from,
+            'bus_to':self.bus_to,
+            'line':self.line,
+            'nb_from':[self.__nb_dict(self.nb_ptr[i], self.nb_mid[i]) for i in range(n)],
+            'nb_to':[self.__nb_dict(self.nb_mid[i], self.nb_ptr[i+1]) for i in range(n)],
+            'vpu_from':self.vpu_from.copy(),
+            'vpu_to':self.vpu_to.copy(),
+            'ika':self.ika.copy(),
+            'ika_max':self.ika_max.copy(),
+            'ika_pre':self.ika_pre.copy(),
+            'ika_pos':self.ika_pos.copy(),
+            'ika_rem':self.ika_rem.copy(),
+            'locked':self.locked.copy(),
+            'over_i':self.over_i.copy(),
+            'mode':[MODES[m] for m in self.mode],
+            }, index=pd.Index(self.ids, name=None))
+        return ssw
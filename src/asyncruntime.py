@@ -0,0 +1,191 @@
+import asyncio
+import heapq
+import random
+
+import numpy as np
+import pandas as pd
+
+from agentstate import MODE_NONE
+
+
+class LinkModel:
+    '''
+    Communication link between adjacent switches
+
+    Each message is delivered after latency + uniform(-jitter, jitter)
+    seconds (never negative) or is lost with probability loss.
+    '''
+
+    def __init__(self, latency: float = 0.005, jitter: float = 0.0, loss: float = 0.0, seed: int = None):
+        '''
+        Parameters:
+        :latency - mean delay of a message (s)
+        :jitter - maximum deviation of the delay (s)
+        :loss - probability of losing a message
+        :seed - seed of the random generator
+        '''
+
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+
+    def delay(self) -> float:
+        '''Delay of the next message, None if it is lost'''
+
+        if self.loss > 0 and self.rng.random() < self.loss:
+            return None
+        if self.jitter > 0:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        return self.latency
+
+
+class AsyncRuntime:
+    '''
+    Run the switch agents of a MASHSG as asyncio coroutines
+
+    Each switch has its own mailbox and evaluates the same rules of
+    MASHSG.step (agentRules) as soon as messages arrive, instead of in
+    lock-step ticks. Messages travel through a LinkModel. Time is virtual,
+    as in a discrete-event simulation: the clock jumps to the arrival of
+    the next message, so only the modeled link delays count and the power
+    flows (solved after the switches change) take no time. The run ends
+    when no message is in flight or waiting in a mailbox.
+    '''
+
+    def __init__(self, mas, link: LinkModel = None):
+        '''
+        Parameters:
+        :mas - MASHSG after begin() and setFaultBus()
+        :link - communication model, default LinkModel()
+        '''
+
+        self.mas = mas
+        self.link = link if link is not None else LinkModel()
+        # registro das mensagens e das manobras
+        self.messages = []
+        self.operations = []
+
+    async def run(self, timeout: float = None) -> dict:
+        '''
+        Run the agents until the communication is quiet
+
+        Parameters:
+        :timeout - limit of the run in virtual time (s), None without limit
+
+        Returns:
+        :dict with restoration time (virtual time of the last switch
+            operation), settled (False when the timeout stopped the run with
+            messages in flight), elapsed (wall clock) time, messages sent and
+            lost, switch operations and power flows
+        '''
+
+        mas = self.mas
+        ag = mas.agents
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        self.messages = []
+        self.operations = []
+        self.__boxes = [asyncio.Queue() for _ in range(len(ag))]
+        # relógio virtual e mensagens em trânsito: (chegada, ordem, chave, mensagem)
+        self.__now = 0.0
+        self.__events = []
+        # mensagens entregues e ainda não tratadas
+        self.__unread = 0
+        self.__idle = asyncio.Event()
+        self.__dirty = False
+        self.__flows = 0
+
+        tasks = [asyncio.create_task(self.__agent(i)) for i in range(len(ag))]
+        try:
+            # nivel 1 dos disjuntores com sobrecorrente
+            for i in np.flatnonzero(ag.over_i & (ag.mode == MODE_NONE) & ag.is_cb & ag.closed):
+                self.__act(int(i), [])
+            if self.__dirty:
+                self.__update()
+
+            while self.__events and (timeout is None or self.__events[0][0] <= timeout):
+                # entrega as mensagens que chegam no mesmo instante
+                self.__now = self.__events[0][0]
+                while self.__events and self.__events[0][0] == self.__now:
+                    _, _, i, msg = heapq.heappop(self.__events)
+                    self.__boxes[i].put_nowait(msg)
+                    self.__unread += 1
+                self.__idle.clear()
+                await self.__idle.wait()
+                # fluxo de potência depois das manobras do instante
+                if self.__dirty:
+                    self.__update()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        end = self.operations[-1]['time'] if self.operations else 0.0
+        return {
+            'restoration_time':end,
+            'settled':not self.__events,
+            'elapsed':loop.time() - start,
+            'messages':len(self.messages),
+            'lost':sum(1 for m in self.messages if m['lost']),
+            'operations':len(self.operations),
+            'flows':self.__flows,
+            }
+
+    def __send(self, sender, recipient, cmd: str, value = '') -> None:
+        delay = self.link.delay()
+        msg = {'time':self.__now, 'sender':sender, 'recipient':recipient, 'cmd':cmd, 'value':value}
+        self.messages.append(dict(msg, lost=delay is None))
+        if delay is None:
+            return
+        heapq.heappush(self.__events, (self.__now + delay, len(self.messages), self.mas.agents.pos[recipient], msg))
+
+    def __act(self, i: int, msgs: list) -> None:
+        '''Rules of switch i, switch operations go to the grid'''
+
+        ag = self.mas.agents
+        closed = bool(ag.closed[i])
+        self.mas.agentRules(i, msgs, self.__send)
+        if bool(ag.closed[i]) != closed:
+            self.operations.append({'time':self.__now, 'switch':ag.ids[i], 'closed':bool(ag.closed[i])})
+            self.__dirty = True
+
+    async def __agent(self, i: int) -> None:
+        box = self.__boxes[i]
+        while True:
+            msgs = [await box.get()]
+            # mensagens que chegaram juntas
+            while not box.empty():
+                msgs.append(box.get_nowait())
+            self.__act(i, msgs)
+            self.__unread -= len(msgs)
+            if self.__unread == 0:
+                self.__idle.set()
+
+    def __update(self) -> None:
+        self.__dirty = False
+        self.mas.updateGrid()
+        self.__flows += 1
+
+    def operations_frame(self) -> pd.DataFrame:
+        '''Switch operations of the last run (time, switch, closed)'''
+
+        return pd.DataFrame(self.operations, columns=['time', 'switch', 'closed'])
+
+
+def run_async(mas, latency: float = 0.005, jitter: float = 0.0, loss: float = 0.0, seed: int = None, timeout: float = None) -> dict:
+    '''
+    Run the agents of mas with asyncio (see AsyncRuntime.run)
+
+    Parameters:
+    :mas - MASHSG after begin() and setFaultBus()
+    :latency - mean delay of a message (s)
+    :jitter - maximum deviation of the delay (s)
+    :loss - probability of losing a message
+    :seed - seed of the random generator
+    :timeout - limit of the run in virtual time (s)
+    '''
+
+    runtime = AsyncRuntime(mas, LinkModel(latency, jitter, loss, seed))
+    return asyncio.run(runtime.run(timeout))
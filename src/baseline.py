@@ -0,0 +1,127 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+# tabelas que não definem o circuito
+_SKIP = ('bus_geodata', 'line_geodata')
+# colunas sobrescritas pelo setFaultBus
+_LOAD_SKIP = ('p_mw', 'q_mvar')
+
+
+def net_fingerprint(net: pp.pandapowerNet) -> str:
+    '''
+    Hash of the element tables of the grid (without results and geodata)
+
+    The load powers are left out, because setFaultBus overwrites them.
+
+    Parameters:
+    :net - pandapowerNet Grid
+    '''
+
+    h = hashlib.sha1()
+    for name in sorted(net.keys()):
+        df = net[name]
+        if name.startswith(('res_', '_')) or name in _SKIP or not isinstance(df, pd.DataFrame) or len(df) == 0:
+            continue
+        if name == 'load':
+            df = df.drop(columns=list(_LOAD_SKIP))
+        h.update(name.encode())
+        h.update(','.join(map(str, df.columns)).encode())
+        try:
+            values = pd.util.hash_pandas_object(df, index=True).values
+        except TypeError:
+            # colunas com objetos não hasheáveis
+            values = pd.util.hash_pandas_object(df.astype(str), index=True).values
+        h.update(values.tobytes())
+    return h.hexdigest()
+
+
+class BaselineCache:
+    '''
+    Pre-fault baseline of setFaultBus
+
+    The maximum load flow (ika_max) and the nominal load flow (ika_pre and
+    the results read by the agents) do not depend on the fault bus. They
+    are kept by grid fingerprint, load powers and solver, in memory and,
+    when a directory is given, in .npz files shared by other processes.
+    '''
+
+    def __init__(self, path: str = None):
+        '''
+        Parameters:
+        :path - directory of the disk store, None to keep only in memory
+        '''
+
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.__mem = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(fingerprint: str, max_pw: float, pre_pw: float, solver: str) -> str:
+        '''Key of the baseline of the grid (net_fingerprint) with the load powers given'''
+
+        return hashlib.sha1(f'{fingerprint}|{max_pw!r}|{pre_pw!r}|{solver}'.encode()).hexdigest()
+
+    def __file(self, key: str) -> str:
+        return os.path.join(self.path, f'baseline_{key}.npz')
+
+    def get(self, key: str) -> dict:
+        '''
+        Baseline of the key, None if not computed yet
+
+        Returns:
+        :dict with ika_max, ika_pre, res_bus and res_line
+        '''
+
+        base = self.__mem.get(key)
+        if base is None and self.path is not None and os.path.exists(self.__file(key)):
+            with np.load(self.__file(key), allow_pickle=False) as data:
+                base = {
+                    'ika_max':data['ika_max'],
+                    'ika_pre':data['ika_pre'],
+                    'res_bus':pd.DataFrame(data['res_bus'], index=data['res_bus_index'], columns=data['res_bus_columns']),
+                    'res_line':pd.DataFrame(data['res_line'], index=data['res_line_index'], columns=data['res_line_columns']),
+                    }
+            self.__mem[key] = base
+
+        if base is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return base
+
+    def put(self, key: str, ika_max: np.ndarray, ika_pre: np.ndarray, res_bus: pd.DataFrame, res_line: pd.DataFrame) -> None:
+        '''
+        Save the baseline of the key
+
+        Parameters:
+        :ika_max - maximum current of the switches
+        :ika_pre - pre-fault current of the switches
+        :res_bus - bus results of the nominal flow
+        :res_line - line results of the nominal flow
+        '''
+
+        base = {'ika_max':ika_max.copy(), 'ika_pre':ika_pre.copy(), 'res_bus':res_bus.copy(), 'res_line':res_line.copy()}
+        self.__mem[key] = base
+
+        if self.path is not None:
+            # grava em arquivo temporário e renomeia, outros processos podem ler
+            tmp = self.__file(key) + f'.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez(f,
+                    ika_max=base['ika_max'], ika_pre=base['ika_pre'],
+                    res_bus=res_bus.values.astype(float), res_bus_index=res_bus.index.values, res_bus_columns=res_bus.columns.values.astype(str),
+                    res_line=res_line.values.astype(float), res_line_index=res_line.index.values, res_line_columns=res_line.columns.values.astype(str),
+                    )
+            os.replace(tmp, self.__file(key))
+
+    def clear(self) -> None:
+        '''Forget the baselines in memory (the disk store is kept)'''
+
+        self.__mem.clear()
@@ -0,0 +1,147 @@
+import argparse
+import copy
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandapower as pp
+
+from MASHSG import MASHSG
+from feedergen import synthetic_grid
+
+# tamanhos (chaves) do benchmark
+SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def bench_size(
+    n_switches: int,
+    faults: int = 1,
+    sections: int = 10,
+    solver: str = 'radial',
+    max_steps: int = 1000,
+    memory: bool = True,
+    seed: int = 0,
+    zone_flow: bool = False,
+    ) -> list:
+    '''
+    Time the phases of MASHSG in a synthetic grid (synthetic_grid)
+
+    Parameters:
+    :n_switches - size of the grid
+    :faults - fault scenarios, load buses drawn with seed
+    :sections - switches per feeder
+    :solver - power flow of MASHSG
+    :max_steps - step limit of each scenario
+    :memory - measure the peak memory with tracemalloc (slower)
+    :seed - seed of the fault buses
+    :zone_flow - solve only the changed feeder zones (MASHSG zoneFlow)
+
+    Returns:
+    :list with one dict per scenario
+    '''
+
+    ini = time.perf_counter()
+    net = synthetic_grid(n_switches, sections=sections)
+    build = time.perf_counter() - ini
+
+    buses = np.random.default_rng(seed).choice(net.load['bus'].values, size=min(faults, len(net.load)), replace=False)
+    results = []
+    for bus in buses:
+        if memory:
+            tracemalloc.start()
+
+        mas = MASHSG(net=copy.deepcopy(net), solver=solver, zoneFlow=zone_flow)
+
+        ini = time.perf_counter()
+        mas.begin()
+        t_begin = time.perf_counter() - ini
+
+        ini = time.perf_counter()
+        mas.setFaultBus(faultBus=int(bus))
+        t_fault = time.perf_counter() - ini
+
+        steps = 0
+        settled = False
+        ini = time.perf_counter()
+        while steps < max_steps:
+            steps += 1
+            if not mas.step():
+                settled = True
+                break
+        t_steps = time.perf_counter() - ini
+
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        results.append({
+            'switches':len(net.switch),
+            'buses':len(net.bus),
+            'lines':len(net.line),
+            'solver':solver,
+            'zone_flow':zone_flow,
+            'fault_bus':int(bus),
+            'build_s':build,
+            'begin_s':t_begin,
+            'setFaultBus_s':t_fault,
+            'steps':steps,
+            'converged':settled,
+            'steps_s':t_steps,
+            'step_s':t_steps / steps,
+            'messages':len(mas.blackboard),
+            'peak_memory_mb':None if peak is None else peak / 2**20,
+            })
+    return results
+
+
+def run_scaling(
+    sizes: list = None,
+    output: str = 'scaling.json',
+    **kwargs,
+    ) -> dict:
+    '''
+    Run bench_size for each size and write the results as JSON
+
+    Parameters:
+    :sizes - number of switches of each grid, default SIZES
+    :output - JSON file, None to only return the results
+    :kwargs - parameters of bench_size
+    '''
+
+    if sizes is None:
+        sizes = SIZES
+
+    report = {
+        'python':platform.python_version(),
+        'pandapower':pp.__version__,
+        'numpy':np.__version__,
+        'machine':platform.machine(),
+        'params':kwargs,
+        'results':[],
+        }
+    for n in sizes:
+        report['results'].extend(bench_size(n, **kwargs))
+        if output is not None:
+            # grava a cada tamanho, os maiores podem não terminar
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=1)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='MASHSG scaling benchmark on synthetic feeders')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='number of switches of each grid')
+    parser.add_argument('--faults', type=int, default=1, help='fault scenarios per size')
+    parser.add_argument('--sections', type=int, default=10, help='switches per feeder')
+    parser.add_argument('--solver', default='radial', choices=['radial', 'pandapower'])
+    parser.add_argument('--zones', action='store_true', help='solve only the changed feeder zones')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace the peak memory')
+    parser.add_argument('--output', default='scaling.json')
+    args = parser.parse_args()
+
+    report = run_scaling(args.sizes, args.output, faults=args.faults, sections=args.sections, solver=args.solver, memory=not args.no_memory, zone_flow=args.zones)
+    for r in report['results']:
+        print('{switches:>7} switches  begin {begin_s:8.3f}s  setFaultBus {setFaultBus_s:8.3f}s  {steps:>4} steps  {step_s:8.4f}s/step'.format(**r))
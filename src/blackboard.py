@@ -0,0 +1,317 @@
+import json
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+
+def _json_value(value):
+    '''Numpy scalars (switch ids, measurements) as Python values'''
+
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _expand(msgs: list, recipient = None) -> list:
+    '''Messages of the records, a batched record gives one message per recipient'''
+
+    out = []
+    for m in msgs:
+        rs = m.get('recipients')
+        if rs is None:
+            if recipient is None or m['recipient'] == recipient:
+                out.append(m)
+            continue
+        for r in rs:
+            if recipient is None or r == recipient:
+                out.append({'time':m['time'], 'sender':m['sender'], 'recipient':r, 'cmd':m['cmd'], 'value':m['value']})
+    return out
+
+
+class MessageArchive:
+    '''
+    On-disk archive of the messages that left the blackboard
+
+    Messages are written as JSON lines in batches, in the order of the
+    board (by instant). Only the file offset and count of each instant are
+    kept in memory (compact arrays), so the messages of any instant are
+    read back with one seek.
+    '''
+
+    def __init__(self, path: str, batch: int = 1000):
+        '''
+        Parameters:
+        :path - archive file (overwritten)
+        :batch - messages buffered before each write
+        '''
+
+        self.path = path
+        self.batch = batch
+        self.__file = open(path, 'w+', encoding='utf-8', newline='\n')
+        # mensagens ainda não gravadas
+        self.__buffer = []
+        # instantes gravados (crescentes), posição no arquivo e número de mensagens
+        self.__times = array('q')
+        self.__offsets = array('q')
+        self.__counts = array('q')
+        self.__count = 0
+        # último instante lido
+        self.__cache = (None, [])
+
+    def write(self, msgs: list) -> None:
+        '''Add messages (in board order) to the archive'''
+
+        self.__buffer.extend(msgs)
+        self.__count += len(msgs)
+        self.__cache = (None, [])
+        if len(self.__buffer) >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        '''Write the buffered messages'''
+
+        if not self.__buffer:
+            return
+        f = self.__file
+        f.seek(0, 2)
+        times = self.__times
+        for msg in self.__buffer:
+            t = msg['time']
+            if not times or times[-1] != t:
+                times.append(t)
+                self.__offsets.append(f.tell())
+                self.__counts.append(0)
+            self.__counts[-1] += 1
+            f.write(json.dumps(msg, default=_json_value) + '\n')
+        f.flush()
+        self.__buffer.clear()
+
+    def at(self, time: int) -> list:
+        '''Messages of the instant time'''
+
+        if self.__cache[0] == time:
+            return self.__cache[1]
+        msgs = []
+        k = bisect_left(self.__times, time)
+        if k < len(self.__times) and self.__times[k] == time:
+            self.__file.seek(self.__offsets[k])
+            msgs = [json.loads(self.__file.readline()) for _ in range(self.__counts[k])]
+        msgs.extend(m for m in self.__buffer if m['time'] == time)
+        self.__cache = (time, msgs)
+        return msgs
+
+    def __iter__(self):
+        self.flush()
+        self.__file.seek(0)
+        for line in self.__file:
+            yield json.loads(line)
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def close(self) -> None:
+        self.flush()
+        self.__file.close()
+
+
+class Blackboard:
+    '''
+    Message board shared by the switch agents
+
+    Messages are kept in posting order and indexed by (time, recipient)
+    and (time, sender), so the mailbox of an agent at one instant is read
+    without scanning the whole history.
+
+    With a retention window only the messages of the last instants stay
+    in memory, the older ones are dropped or moved to a MessageArchive,
+    from where at(), inbox() and outbox() still read them.
+
+    A message sent to several recipients may be posted as one batched
+    record (post_batch), which at(), inbox() and outbox() expand in one
+    message per recipient. The board (len, iteration) holds the records.
+    '''
+
+    def __init__(self, retention: int = None, archive: MessageArchive = None):
+        '''
+        Parameters:
+        :retention - instants kept in memory (at least 2, the read and the
+            posted ones), None to keep every message
+        :archive - archive of the messages out of the window, None to drop them
+        '''
+
+        if retention is not None and retention < 2:
+            raise ValueError('retention must keep at least 2 instants')
+        self.retention = retention
+        self.archive = archive
+        # mensagens na ordem de postagem
+        self.__msgs = deque()
+        # mensagens que saíram da memória
+        self.__evicted = 0
+        self.__last = None
+        # índices por instante
+        self.__time = {}
+        self.__recipient = {}
+        self.__sender = {}
+        # instantes com registros em lote (expandidos na leitura)
+        self.__batched = set()
+
+    def post(self, time: int, sender, recipient, cmd: str, value = '') -> dict:
+        '''
+        Post a message to the board
+
+        Parameters:
+        :time - instant when the message is delivered
+        :sender - switch id that sends
+        :recipient - switch id that receives
+        :cmd - command name
+        :value - command payload
+        '''
+
+        msg = {'time':time, 'sender':sender, 'recipient':recipient, 'cmd':cmd, 'value':value}
+        self.append(msg)
+        return msg
+
+    def post_batch(self, time: int, sender, recipients, cmd: str, value = '') -> dict:
+        '''
+        Post one message to several recipients as a single batched record
+
+        Parameters:
+        :time - instant when the message is delivered
+        :sender - switch id that sends
+        :recipients - switch ids that receive, in delivery order
+        :cmd - command name
+        :value - command payload
+        '''
+
+        msg = {'time':time, 'sender':sender, 'recipients':tuple(recipients), 'cmd':cmd, 'value':value}
+        self.append(msg)
+        return msg
+
+    @staticmethod
+    def __recipients(msg: dict):
+        rs = msg.get('recipients')
+        return (msg['recipient'],) if rs is None else rs
+
+    def append(self, msg: dict) -> None:
+        '''Post a message (or batched record) already built as dict (list compatible)'''
+
+        t = msg['time']
+        if self.retention is not None and (self.__last is None or t > self.__last):
+            self.__last = t
+            self.__evict(t - self.retention)
+        self.__msgs.append(msg)
+        self.__time.setdefault(t, []).append(msg)
+        for r in self.__recipients(msg):
+            self.__recipient.setdefault((t, r), []).append(msg)
+        self.__sender.setdefault((t, msg['sender']), []).append(msg)
+        if 'recipients' in msg:
+            self.__batched.add(t)
+
+    def __evict(self, time: int) -> None:
+        '''Take the messages of the instants up to time out of memory'''
+
+        msgs = self.__msgs
+        old = []
+        while msgs and msgs[0]['time'] <= time:
+            msg = msgs.popleft()
+            t = msg['time']
+            self.__time.pop(t, None)
+            for r in self.__recipients(msg):
+                self.__recipient.pop((t, r), None)
+            self.__sender.pop((t, msg['sender']), None)
+            self.__batched.discard(t)
+            old.append(msg)
+        self.__evicted += len(old)
+        if self.archive is not None and old:
+            self.archive.write(old)
+
+    def __archived(self, time: int) -> list:
+        if self.archive is None or time in self.__time or not self.__evicted:
+            return []
+        return self.archive.at(time)
+
+    def inbox(self, time: int, recipient) -> list:
+        '''Messages delivered to recipient at time (read only)'''
+
+        msgs = self.__recipient.get((time, recipient))
+        if msgs is None:
+            return _expand(self.__archived(time), recipient)
+        return _expand(msgs, recipient) if time in self.__batched else msgs
+
+    def outbox(self, time: int, sender) -> list:
+        '''Messages sent by sender for time (read only)'''
+
+        msgs = self.__sender.get((time, sender))
+        if msgs is None:
+            return _expand([m for m in self.__archived(time) if m['sender'] == sender])
+        return _expand(msgs) if time in self.__batched else msgs
+
+    def at(self, time: int) -> list:
+        '''Messages of the instant time (read only)'''
+
+        msgs = self.__time.get(time)
+        if msgs is None:
+            return _expand(self.__archived(time))
+        return _expand(msgs) if time in self.__batched else msgs
+
+    def rewind(self, n: int) -> None:
+        '''
+        Remove the messages posted after the first n
+
+        Parameters:
+        :n - number of messages kept (len of the board at the position)
+        '''
+
+        if n < self.__evicted:
+            raise ValueError(f'message {n} is out of the retention window')
+        # as últimas mensagens são as últimas de cada índice
+        msgs = self.__msgs
+        while len(msgs) > n - self.__evicted:
+            msg = msgs.pop()
+            t = msg['time']
+            keys = [(self.__time, t), (self.__sender, (t, msg['sender']))]
+            keys.extend((self.__recipient, (t, r)) for r in self.__recipients(msg))
+            for index, key in keys:
+                lst = index[key]
+                lst.pop()
+                if not lst:
+                    del index[key]
+        self.__last = msgs[-1]['time'] if msgs else None
+
+    def clear(self) -> None:
+        if self.archive is not None and self.__evicted:
+            # arquivo novo, no mesmo caminho
+            self.archive.close()
+            self.archive = MessageArchive(self.archive.path, self.archive.batch)
+        self.__msgs.clear()
+        self.__evicted = 0
+        self.__last = None
+        self.__time.clear()
+        self.__recipient.clear()
+        self.__sender.clear()
+        self.__batched.clear()
+
+    def to_list(self) -> list:
+        '''List of dicts view with every record posted (archived ones included)'''
+
+        return list(self)
+
+    def __iter__(self):
+        if self.archive is not None and self.__evicted:
+            yield from self.archive
+        yield from self.__msgs
+
+    def __len__(self) -> int:
+        '''Records posted (a batch counts once), also the ones out of memory'''
+
+        return self.__evicted + len(self.__msgs)
+
+    def __getitem__(self, i):
+        if self.__evicted or isinstance(i, slice):
+            return self.to_list()[i]
+        return self.__msgs[i]
+
+    def __repr__(self) -> str:
+        return f'Blackboard(messages={len(self)}, instants={len(self.__time)})'
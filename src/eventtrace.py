@@ -0,0 +1,320 @@
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from agentstate import AgentState, STATIC, CMD_CODE
+
+# tipos de quadro
+KINDS = ['start', 'fault', 'step']
+KIND_CODE = {kind:n for n, kind in enumerate(KINDS)}
+
+# registros de tamanho fixo
+FRAME_DTYPE = np.dtype([('t', '<i4'), ('kind', 'i1'), ('fault_bus', '<i8'), ('change', '<i8'), ('meas', '<i4'), ('param', '<i4')])
+CHANGE_DTYPE = np.dtype([('switch', '<i4'), ('closed', '?'), ('net_closed', '?'), ('mode', 'i1')])
+MSG_DTYPE = np.dtype([('time', '<i4'), ('sender', '<i4'), ('recipient', '<i4'), ('cmd', 'i1'), ('value', '<f8')])
+
+
+class _Records:
+    '''Append-only array of fixed-width records, in memory or in a memory-mapped temporary file'''
+
+    def __init__(self, dtype: np.dtype, size: int = 64, directory: str = None):
+        self.n = 0
+        self.__file = None
+        if directory is None:
+            self.data = np.zeros(size, dtype=dtype)
+        else:
+            # arquivo apagado ao ser fechado, as páginas gravadas saem da memória
+            self.__file = tempfile.TemporaryFile(dir=directory)
+            self.data = self.__map(np.dtype(dtype), size)
+
+    def __map(self, dtype: np.dtype, size: int) -> np.memmap:
+        self.__file.truncate(size * dtype.itemsize)
+        return np.memmap(self.__file, dtype=dtype, mode='r+', shape=(size,))
+
+    def __reserve(self, k: int) -> None:
+        if self.n + k > len(self.data):
+            size = len(self.data) + max(len(self.data), k)
+            if self.__file is None:
+                grow = np.zeros(size - len(self.data), dtype=self.data.dtype)
+                self.data = np.concatenate((self.data, grow))
+            else:
+                self.data.flush()
+                self.data = self.__map(self.data.dtype, size)
+
+    def append(self, record: tuple) -> int:
+        self.__reserve(1)
+        self.data[self.n] = record
+        self.n += 1
+        return self.n - 1
+
+    def extend(self, records: np.ndarray) -> None:
+        self.__reserve(len(records))
+        self.data[self.n:self.n + len(records)] = records
+        self.n += len(records)
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.n]
+
+    def truncate(self, n: int) -> None:
+        self.n = n
+
+
+class EventTrace:
+    '''
+    Compact binary record of a simulation
+
+    The trace is a set of append-only NumPy structured arrays: the frames,
+    the switches whose state changed in each frame (agent closed, grid
+    closed and mode), every blackboard message and the switch measurements
+    and parameters, stored only when they change. The report is rendered
+    from the frames and replay() rebuilds the switch table (ssw) at any
+    instant without running the power flow. With a directory the arrays
+    are memory-mapped temporary files, so a long run does not grow the
+    memory.
+    '''
+
+    def __init__(self, keep: bool = True, directory: str = None):
+        '''
+        Parameters:
+        :keep - keep the frames for replay, False when the report is streamed
+        :directory - directory of the temporary files where the records are
+            kept (memory-mapped), None to keep them in memory
+        '''
+
+        self.keep = keep
+        self.directory = directory
+        self.clear()
+
+    def clear(self) -> None:
+        # atributos fixos das chaves (AgentState.static)
+        self.static = None
+        self.frames = _Records(FRAME_DTYPE, directory=self.directory)
+        self.changes = _Records(CHANGE_DTYPE, directory=self.directory)
+        self.messages = _Records(MSG_DTYPE, directory=self.directory)
+        # medições e parâmetros das chaves (criados no primeiro quadro)
+        self.meas = None
+        self.params = None
+        # último estado gravado
+        self.__closed = None
+        self.__netClosed = None
+        self.__mode = None
+        self.__meas = None
+        self.__param = None
+
+    def mark(self) -> tuple:
+        '''Position of the trace, to go back to it with rewind()'''
+
+        counts = tuple(None if r is None else r.n for r in (self.frames, self.changes, self.messages, self.meas, self.params))
+        return counts + (self.__closed, self.__netClosed, self.__mode, self.__meas, self.__param)
+
+    def rewind(self, mark: tuple) -> None:
+        '''
+        Drop the records after a position of mark()
+
+        Parameters:
+        :mark - position returned by mark() in this trace
+        '''
+
+        for r, n in zip((self.frames, self.changes, self.messages, self.meas, self.params), mark[:5]):
+            if r is not None:
+                r.truncate(n or 0)
+        self.__closed, self.__netClosed, self.__mode, self.__meas, self.__param = mark[5:]
+
+    def __init_switches(self, agents) -> None:
+        n = len(agents)
+        self.static = {key:(val.astype(str) if val.dtype == object else val.copy()) for key, val in agents.static().items()}
+        self.meas = _Records(np.dtype([('vpu_from', '<f8', (n,)), ('vpu_to', '<f8', (n,)), ('ika', '<f8', (n,))]), directory=self.directory)
+        self.params = _Records(np.dtype([
+            ('ika_max', '<f8', (n,)), ('ika_pre', '<f8', (n,)), ('ika_pos', '<f8', (n,)), ('ika_rem', '<f8', (n,)), ('locked', '?', (n,)),
+            ]), directory=self.directory)
+
+    def record(self, kind: str, t: int, agents, net_closed: np.ndarray, blackboard = None, **info) -> dict:
+        '''
+        Record a frame of the simulation
+
+        Parameters:
+        :kind - "start", "fault" or "step"
+        :t - simulation instant
+        :agents - AgentState of the switches
+        :net_closed - switch states in the grid (net.switch['closed'])
+        :blackboard - its messages of instant t are recorded (step frames)
+        :info - faultBus of the fault frame
+
+        Returns:
+        :frame as dict (kind, t, meas and info)
+        '''
+
+        closed = agents.closed
+        mode = agents.mode
+        net_closed = np.asarray(net_closed, dtype=bool)
+
+        if self.__closed is None:
+            changed = np.arange(len(closed))
+        else:
+            changed = np.flatnonzero((closed != self.__closed) | (net_closed != self.__netClosed) | (mode != self.__mode))
+
+        # medições, compartilhadas com o quadro anterior se não mudaram
+        meas = self.__meas
+        new_meas = meas is None or not (np.array_equal(meas[0], agents.vpu_from) and np.array_equal(meas[1], agents.vpu_to) and np.array_equal(meas[2], agents.ika))
+        if new_meas:
+            meas = (agents.vpu_from.copy(), agents.vpu_to.copy(), agents.ika.copy())
+
+        # parâmetros, mudam só no setFaultBus
+        param = (agents.ika_max, agents.ika_pre, agents.ika_pos, agents.ika_rem, agents.locked)
+        new_param = self.__param is None or not all(np.array_equal(a, b) for a, b in zip(param, self.__param))
+        if new_param:
+            param = tuple(a.copy() for a in param)
+        else:
+            param = self.__param
+
+        frame = {'kind':kind, 't':t, 'meas':meas}
+        frame.update(info)
+
+        if self.keep:
+            if self.static is None:
+                self.__init_switches(agents)
+
+            rec = np.zeros(len(changed), dtype=CHANGE_DTYPE)
+            rec['switch'] = changed
+            rec['closed'] = closed[changed]
+            rec['net_closed'] = net_closed[changed]
+            rec['mode'] = mode[changed]
+            change0 = self.changes.n
+            self.changes.extend(rec)
+
+            if new_meas:
+                self.meas.append(meas)
+            if new_param:
+                self.params.append(param)
+            self.frames.append((t, KIND_CODE[kind], info.get('faultBus', -1), change0, self.meas.n - 1, self.params.n - 1))
+
+            if blackboard is not None:
+                self.__record_messages(blackboard.at(t), agents)
+
+        self.__closed = closed.copy()
+        self.__netClosed = net_closed.copy()
+        self.__mode = mode.copy()
+        self.__meas = meas
+        self.__param = param
+        return frame
+
+    def __record_messages(self, msgs: list, agents) -> None:
+        rec = np.zeros(len(msgs), dtype=MSG_DTYPE)
+        for k, m in enumerate(msgs):
+            value = m['value']
+            rec[k] = (m['time'], agents.pos[m['sender']], agents.pos[m['recipient']], CMD_CODE[m['cmd']], 0.0 if value == '' else value)
+        self.messages.extend(rec)
+
+    def iter_frames(self):
+        '''
+        Iterate over the frames with the full state of each one
+
+        Yields:
+        :(frame, closed, net_closed, mode) - arrays are reused between frames
+        '''
+
+        if self.static is None:
+            return
+        n = len(self.static['ids'])
+        closed = np.zeros(n, dtype=bool)
+        net_closed = np.zeros(n, dtype=bool)
+        mode = np.zeros(n, dtype=np.int8)
+
+        frames = self.frames.view()
+        changes = self.changes.view()
+        meas = self.meas.view()
+        ends = np.append(frames['change'][1:], len(changes))
+        for f, end in zip(frames, ends):
+            c = changes[f['change']:end]
+            closed[c['switch']] = c['closed']
+            net_closed[c['switch']] = c['net_closed']
+            mode[c['switch']] = c['mode']
+
+            m = meas[f['meas']]
+            frame = {'kind':KINDS[f['kind']], 't':int(f['t']), 'meas':(m['vpu_from'], m['vpu_to'], m['ika'])}
+            if f['kind'] == KIND_CODE['fault']:
+                frame['faultBus'] = int(f['fault_bus'])
+            yield frame, closed, net_closed, mode
+
+    def replay(self, t: int) -> pd.DataFrame:
+        '''
+        Rebuild the switch table (ssw) at instant t
+
+        Parameters:
+        :t - simulation instant, the last frame at or before t is used
+
+        Returns:
+        :DataFrame like MASHSG.ssw, None if there is no frame until t
+        '''
+
+        frames = self.frames.view()
+        k = np.searchsorted(frames['t'], t, side='right') - 1
+        if k < 0:
+            return None
+        f = frames[k]
+
+        ag = AgentState.from_static(self.static)
+
+        changes = self.changes.view()
+        end = frames['change'][k + 1] if k + 1 < len(frames) else len(changes)
+        c = changes[:end]
+        ag.closed[c['switch']] = c['closed']
+        ag.mode[c['switch']] = c['mode']
+
+        m = self.meas.view()[f['meas']]
+        ag.vpu_from[:] = m['vpu_from']
+        ag.vpu_to[:] = m['vpu_to']
+        ag.ika[:] = m['ika']
+
+        p = self.params.view()[f['param']]
+        for key in ('ika_max', 'ika_pre', 'ika_pos', 'ika_rem', 'locked'):
+            getattr(ag, key)[:] = p[key]
+        ag.over_i[:] = ag.ika_max < ag.ika_pos
+
+        # mensagens recebidas até o quadro (lidas nos passos anteriores a ele)
+        msgs = self.messages.view()
+        for msg in msgs[msgs['time'] < f['t']]:
+            ag.receive(int(msg['recipient']), int(msg['sender']), msg['cmd'], msg['value'])
+
+        return ag.to_frame()
+
+    def save(self, file) -> None:
+        '''
+        Save the trace in a NumPy .npz file
+
+        Parameters:
+        :file - file name or file object
+        '''
+
+        arrays = {'frames':self.frames.view(), 'changes':self.changes.view(), 'messages':self.messages.view()}
+        if self.static is not None:
+            arrays['meas'] = self.meas.view()
+            arrays['params'] = self.params.view()
+            arrays.update({'sw_' + key:val for key, val in self.static.items()})
+        np.savez_compressed(file, **arrays)
+
+    @classmethod
+    def load(cls, file) -> 'EventTrace':
+        '''
+        Load a trace saved by save()
+
+        Parameters:
+        :file - file name or file object
+        '''
+
+        trace = cls()
+        with np.load(file) as data:
+            trace.frames.extend(data['frames'])
+            trace.changes.extend(data['changes'])
+            trace.messages.extend(data['messages'])
+            if 'meas' in data:
+                trace.static = {key:data['sw_' + key] for key in STATIC}
+                trace.meas = _Records(data['meas'].dtype)
+                trace.meas.extend(data['meas'])
+                trace.params = _Records(data['params'].dtype)
+                trace.params.extend(data['params'])
+        return trace
+
+    def __len__(self) -> int:
+        return self.frames.n
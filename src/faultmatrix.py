@@ -0,0 +1,167 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+import pandapower.shortcircuit as sc
+
+from radialflow import RadialFlow, RadialFlowError
+
+# parâmetros de curto das redes externas quando não informados
+SC_DEFAULTS = {'s_sc_max_mva':1000.0, 'rx_max':0.1}
+
+
+def _set_loads(net: pp.pandapowerNet, pw: float) -> None:
+    '''Same load powers of setFaultBus'''
+
+    net.load.loc[:,'p_mw'] = pw
+    net.load.loc[:,'q_mvar'] = pw/10
+
+
+def _switch_currents(net: pp.pandapowerNet) -> np.ndarray:
+    return net.res_line.loc[net.switch['element'],'i_ka'].values
+
+
+def fault_currents(
+    net: pp.pandapowerNet,
+    fault_buses: list = None,
+    pre_pw: float = 0.04,
+    fault_pw: float = 1.0,
+    exact: bool = False,
+    ) -> pd.DataFrame:
+    '''
+    Post-fault current of every switch for every fault bus
+
+    The fault is the load of setFaultBus (p_mw = fault_pw in the loads of
+    the bus, on top of the nominal loads). In a radial grid all scenarios
+    are computed together by superposition on the pre-fault solution
+    (RadialFlow.load_sweep), with one sparse solve per block of buses.
+    Otherwise, or with exact=True, each scenario runs a power flow.
+
+    Parameters:
+    :net - pandapowerNet Grid (not changed)
+    :fault_buses - buses with fault, default all load buses
+    :pre_pw - nominal load power (setFaultBus)
+    :fault_pw - load power of the fault bus (setFaultBus)
+    :exact - one power flow per fault bus
+
+    Returns:
+    :DataFrame (switch ids x fault buses) with ika_pos
+    '''
+
+    if fault_buses is None:
+        fault_buses = net.load['bus'].unique()
+    fault_buses = np.asarray([int(b) for b in fault_buses], dtype=np.int64)
+
+    net = copy.deepcopy(net)
+    _set_loads(net, pre_pw)
+
+    ika = None
+    if not exact:
+        try:
+            rf = RadialFlow(net)
+            rf.run(net)
+
+            # potência acrescentada em cada barra (cargas da barra vão a fault_pw)
+            ld = net.load
+            on = ld['in_service'].values.astype(bool)
+            dp = (fault_pw - ld['p_mw'].values) * ld['scaling'].values * on
+            s_add = pd.Series(dp, index=ld['bus'].values).groupby(level=0).sum()
+            s_add = s_add.reindex(fault_buses, fill_value=0.0).values
+
+            lines = net.line.index.get_indexer(net.switch['element'].values)
+            ika = rf.load_sweep(net.bus.index.get_indexer(fault_buses), s_add, lines)
+        except RadialFlowError:
+            # rede malhada, calcula cada cenário
+            pass
+
+    if ika is None:
+        ika = np.zeros((len(net.switch), len(fault_buses)))
+        p_mw = net.load['p_mw'].values.copy()
+        for k, bus in enumerate(fault_buses):
+            net.load['p_mw'] = p_mw
+            net.load.loc[net.load['bus'] == bus,'p_mw'] = fault_pw
+            pp.runpp(net, neglect_open_switch_branches=True)
+            ika[:, k] = _switch_currents(net)
+
+    return pd.DataFrame(np.nan_to_num(ika), index=net.switch.index, columns=pd.Index(fault_buses, name='fault_bus'))
+
+
+def sc_fault_currents(net: pp.pandapowerNet, fault_buses: list = None) -> pd.DataFrame:
+    '''
+    Three-phase short-circuit current of every switch for every fault bus
+
+    One pandapower.shortcircuit.calc_sc call (IEC 60909, maximum case)
+    with the current of each branch for each fault bus. The ext_grid
+    columns of SC_DEFAULTS are filled when missing.
+
+    Parameters:
+    :net - pandapowerNet Grid (not changed)
+    :fault_buses - buses with fault, default all buses
+
+    Returns:
+    :DataFrame (switch ids x fault buses) with ika_pos
+    '''
+
+    net = copy.deepcopy(net)
+    for col, val in SC_DEFAULTS.items():
+        if col not in net.ext_grid:
+            net.ext_grid[col] = val
+        else:
+            net.ext_grid[col] = net.ext_grid[col].fillna(val)
+
+    if fault_buses is not None:
+        fault_buses = [int(b) for b in fault_buses]
+    sc.calc_sc(net, bus=fault_buses, fault='3ph', case='max', branch_results=True, return_all_currents=True)
+
+    # linhas x barras com falta
+    ik = net.res_line_sc['ikss_ka'].unstack('bus').fillna(0)
+    ika = ik.loc[net.switch['element'].values]
+    ika.index = net.switch.index
+    ika.columns.name = 'fault_bus'
+    return ika
+
+
+def fault_overcurrents(
+    net: pp.pandapowerNet,
+    fault_buses: list = None,
+    max_pw: float = 0.08,
+    pre_pw: float = 0.04,
+    fault_pw: float = 1.0,
+    exact: bool = False,
+    model: str = 'load',
+    ) -> pd.DataFrame:
+    '''
+    Level 1 of the agents (over_i) for every fault bus at once
+
+    Parameters:
+    :net - pandapowerNet Grid (not changed)
+    :fault_buses - buses with fault, default all load buses
+    :max_pw - maximum load power (setFaultBus)
+    :pre_pw - nominal load power (setFaultBus)
+    :fault_pw - load power of the fault bus (setFaultBus)
+    :exact - one power flow per fault bus
+    :model
+        :"load" - fault load of setFaultBus (fault_currents)
+        :"sc" - short-circuit currents (sc_fault_currents)
+
+    Returns:
+    :DataFrame (switch ids x fault buses), True where ika_max < ika_pos
+    '''
+
+    # corrente máxima, como no setFaultBus
+    mx = copy.deepcopy(net)
+    _set_loads(mx, max_pw)
+    try:
+        RadialFlow(mx).run(mx)
+    except RadialFlowError:
+        pp.runpp(mx, neglect_open_switch_branches=True)
+    ika_max = np.array([round(x,2)+0.01 for x in _switch_currents(mx)])
+
+    if model == 'sc':
+        if fault_buses is None:
+            fault_buses = net.load['bus'].unique()
+        ika_pos = sc_fault_currents(net, fault_buses)
+    else:
+        ika_pos = fault_currents(net, fault_buses, pre_pw, fault_pw, exact)
+    return ika_pos.gt(ika_max, axis=0)
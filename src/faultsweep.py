@@ -0,0 +1,126 @@
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandapower as pp
+import pandas as pd
+
+from MASHSG import MASHSG
+from baseline import BaselineCache
+from flowcache import FlowCache
+from switchteams import neighbor_teams
+
+# colunas do resultado de cada falta
+_COLUMNS = ['fault_bus', 'steps', 'converged', 'switches_changed', 'load_restored_mw', 'loads_restored', 'wall_time']
+
+# agente de cada processo (worker)
+_mas = None
+_params = None
+
+
+def _init_worker(net: pp.pandapowerNet, teams: tuple, params: dict) -> None:
+    '''Create the agent of the worker process once, with the shared teams'''
+
+    global _mas, _params
+    flowCache = FlowCache(params['flow_cache']) if params['flow_cache'] else None
+    _mas = MASHSG(net=net, teams=teams, baseline=BaselineCache(params['baseline_dir']), faultModel=params['fault_model'], flowCache=flowCache)
+    _params = params
+
+
+def _run_fault(faultBus: int) -> dict:
+    '''Simulate one fault scenario in the agent of the worker'''
+
+    mas = _mas
+    net = mas.net
+    max_steps = _params['max_steps']
+
+    ini = time.perf_counter()
+    mas.begin()
+    mas.setFaultBus(faultBus=faultBus, max_pw=_params['max_pw'], pre_pw=_params['pre_pw'])
+
+    steps = 0
+    settled = False
+    while steps < max_steps:
+        steps += 1
+        if not mas.step():
+            settled = True
+            break
+    wall = time.perf_counter() - ini
+
+    # chaves com estado final diferente do inicial (abrir e fechar de novo não conta)
+    changed = int((net.switch['closed'].values != mas.ini_closed).sum())
+
+    # cargas energizadas, sem a carga da barra com falta
+    vm_pu = net.res_bus.loc[net.load['bus'], 'vm_pu'].fillna(0).values
+    restored = (vm_pu > 0.001) & (net.load['bus'].values != faultBus)
+
+    return {
+        'fault_bus':faultBus,
+        'steps':steps,
+        'converged':settled,
+        'switches_changed':changed,
+        'load_restored_mw':float(net.load['p_mw'].values[restored].sum()),
+        'loads_restored':int(restored.sum()),
+        'wall_time':wall,
+        }
+
+
+def run_fault_sweep(
+    net: pp.pandapowerNet,
+    fault_buses: list = None,
+    processes: int = None,
+    max_steps: int = 100,
+    max_pw: float = 0.08,
+    pre_pw: float = 0.04,
+    baseline_dir: str = None,
+    fault_model: str = 'load',
+    flow_cache: int = None,
+    ) -> pd.DataFrame:
+    '''
+    Simulate a fault in every bus of the list using a process pool
+
+    The neighbor teams are computed once and sent with the grid to each
+    worker, that keeps one agent and reuses it for all of its scenarios.
+    The pre-fault flows are computed once per worker, or once for all
+    workers and later sweeps when baseline_dir is given.
+
+    Parameters:
+    :net - pandapowerNet Grid (not changed)
+    :fault_buses - buses with fault, default all load buses
+    :processes - number of worker processes, default cpu count (1 runs in this process)
+    :max_steps - step limit of each scenario
+    :max_pw - maximum load power (setFaultBus)
+    :pre_pw - nominal load power (setFaultBus)
+    :baseline_dir - directory of the pre-fault baseline store (BaselineCache)
+    :fault_model - "load" or "sc" (MASHSG faultModel), "sc" computes the
+        fault currents of all buses once per worker
+    :flow_cache - size of the power flow cache (FlowCache) of each worker, None without cache
+
+    Returns:
+    :DataFrame with one row per fault bus (index fault_bus), switches_changed
+        counts the switches whose final state differs from the initial one
+    '''
+
+    if fault_buses is None:
+        fault_buses = net.load['bus'].values
+    fault_buses = [int(b) for b in fault_buses]
+    if not fault_buses:
+        return pd.DataFrame(columns=_COLUMNS).set_index('fault_bus')
+
+    teams = neighbor_teams(net)
+    params = {'max_steps':max_steps, 'max_pw':max_pw, 'pre_pw':pre_pw, 'baseline_dir':baseline_dir, 'fault_model':fault_model, 'flow_cache':flow_cache}
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(fault_buses)))
+
+    if processes == 1:
+        _init_worker(copy.deepcopy(net), teams, params)
+        results = [_run_fault(b) for b in fault_buses]
+    else:
+        chunksize = max(1, len(fault_buses) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(net, teams, params)) as pool:
+            results = list(pool.map(_run_fault, fault_buses, chunksize=chunksize))
+
+    return pd.DataFrame(results, columns=_COLUMNS).set_index('fault_bus')
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+# tipo das linhas do circuito exemplo
+STD_TYPE = '15-AL1/3-ST1A 0.4'
+
+
+def feeder_grid(
+    n_feeders: int = 4,
+    sections: int = 5,
+    section_km: float = 1.0,
+    switch_km: float = 0.01,
+    load_pw: float = 0.04,
+    vn_kv: float = 13.8,
+    ties: str = 'pairs',
+    ) -> pp.pandapowerNet:
+    '''
+    Synthetic radial grid with feeders connected by tie switches
+
+    Each feeder starts at a substation (ext_grid) and is a chain of
+    sections. A section is a switch line (CB in the first section, LBS in
+    the others) followed by a line to the load bus of the section, like
+    sample/Circuito01.py. The last load buses of neighbor feeders are
+    joined by open tie switches (LBS). The grid is built with the
+    vectorized create functions of pandapower.
+
+    Parameters:
+    :n_feeders - number of feeders (and substations)
+    :sections - switches per feeder
+    :section_km - length of the line of each section
+    :switch_km - length of the switch lines
+    :load_pw - load power of each load bus (MW, q = p/10)
+    :vn_kv - nominal voltage
+    :ties
+        :"pairs" - feeders 2k and 2k+1 are tied (n_feeders // 2 ties)
+        :"chain" - each feeder is tied to the next (n_feeders - 1 ties), the
+            messages of the agents may then travel through all feeders
+    '''
+
+    F, S = n_feeders, sections
+    net = pp.create_empty_network()
+
+    # == Barras ==
+    # por alimentador: subestação e (chave a, chave b, carga) por seção
+    per_feeder = 1 + 3 * S
+    n_feeder_bus = F * per_feeder
+    feeder = np.repeat(np.arange(F), per_feeder)
+    k = np.tile(np.arange(per_feeder), F)
+    x = np.where(k == 0, 0.0, (k + 2) // 3 * 100.0 + ((k - 1) % 3) * 25.0)
+    y = feeder * 200.0
+    kind = np.where(k == 0, 'SE', np.array(['a', 'b', ''])[(k - 1) % 3])
+    names = [f'SE-{f}' if c == 'SE' else (f's{f}.{(j - 1) // 3}{c}' if c else '') for f, j, c in zip(feeder, k, kind)]
+
+    # barras das chaves de interligação entre alimentadores vizinhos
+    if ties == 'chain':
+        tie_f = np.arange(F - 1)
+    else:
+        tie_f = np.arange(0, F - 1, 2)
+    n_tie = len(tie_f)
+    tie_k = np.repeat(tie_f, 2)
+    tie_x = np.full(2 * n_tie, S * 100.0 + 150.0)
+    tie_y = tie_k * 200.0 + np.tile([80.0, 120.0], n_tie)
+    tie_names = [f't{f}{c}' for f, c in zip(tie_k, np.tile(['a', 'b'], n_tie))]
+
+    pp.create_buses(net, n_feeder_bus + 2 * n_tie, vn_kv,
+        name=names + tie_names,
+        geodata=list(zip(np.concatenate((x, tie_x)), np.concatenate((y, tie_y)))),
+        )
+
+    base = np.arange(F)[:, None] * per_feeder
+    j = np.arange(S)[None, :]
+    sub = base[:, 0]
+    bus_a = (base + 1 + 3 * j).ravel()
+    bus_b = (base + 2 + 3 * j).ravel()
+    bus_l = (base + 3 + 3 * j).ravel()
+    tie_a = n_feeder_bus + 2 * np.arange(n_tie)
+    tie_b = tie_a + 1
+    last = bus_l.reshape(F, S)[:, -1]
+
+    # == Subestações ==
+    eg = pd.DataFrame({
+        'name':[f'SE-{f}' for f in range(F)], 'bus':sub, 'vm_pu':1.05, 'va_degree':0.0, 'slack_weight':1.0, 'in_service':True,
+        })
+    net.ext_grid = pd.concat([net.ext_grid, eg.astype(net.ext_grid.dtypes[eg.columns])], ignore_index=True)
+
+    # == Cargas ==
+    pp.create_loads(net, bus_l, p_mw=load_pw, q_mvar=load_pw/10)
+
+    # == Linhas ==
+    # trechos: subestação/carga anterior até a chave e chave até a carga
+    prev = np.concatenate((sub[:, None], bus_l.reshape(F, S)[:, :-1]), axis=1).ravel()
+    from_bus = np.concatenate((prev, bus_b, last[tie_f], tie_b))
+    to_bus = np.concatenate((bus_a, bus_l, tie_a, last[tie_f + 1]))
+    pp.create_lines(net, from_bus, to_bus, section_km, STD_TYPE)
+
+    # linhas das chaves
+    sw_from = np.concatenate((bus_a, tie_a))
+    sw_to = np.concatenate((bus_b, tie_b))
+    sw_line = pp.create_lines(net, sw_from, sw_to, switch_km, STD_TYPE)
+
+    # == Chaves ==
+    n_sw = F * S
+    sw_type = np.where(np.tile(np.arange(S), F) == 0, 'CB', 'LBS')
+    pp.create_switches(net, sw_from, sw_line, 'l',
+        closed=np.concatenate((np.ones(n_sw, dtype=bool), np.zeros(n_tie, dtype=bool))),
+        type=np.concatenate((sw_type, np.full(n_tie, 'LBS'))).tolist(),
+        name=[f'S{n + 1}' for n in range(n_sw + n_tie)],
+        )
+    return net
+
+
+def synthetic_grid(n_switches: int, sections: int = 10, **kwargs) -> pp.pandapowerNet:
+    '''
+    Feeder grid (feeder_grid) with tied pairs of feeders and about n_switches switches
+
+    Parameters:
+    :n_switches - target number of switches
+    :sections - switches per feeder
+    :kwargs - other parameters of feeder_grid
+    '''
+
+    sections = max(1, min(sections, n_switches))
+    n_feeders = max(1, int(round(n_switches / (sections + 0.5))))
+    return feeder_grid(n_feeders=n_feeders, sections=sections, **kwargs)
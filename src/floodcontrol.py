@@ -0,0 +1,159 @@
+# comandos propagados de chave em chave (inundação)
+FLOODS = ('SearchFault', 'IsolateInfo', 'SearchRemai', 'IkARemai')
+
+
+class FloodControl:
+    '''
+    Protocol layer between the agent rules and the blackboard
+
+    Every message of a flood command (FLOODS) gets an id (originator,
+    command, sequence): a forwarded message keeps the id of the message of
+    the same command received by the switch in the tick, the others start
+    a new flood. A switch sends each flood id (with the same value) to a
+    neighbor only once while the flood is younger than horizon ticks and,
+    with a hop limit, floods stop after hop_limit forwards. The messages of
+    one tick are posted together at the end of the tick, dropping the ones
+    equal to a message already posted in the tick. The fan-out of a switch
+    (the same command and value sent in a row to several neighbors) is
+    posted as one batched record (Blackboard.post_batch).
+    '''
+
+    def __init__(self, dedup: bool = True, hop_limit: int = None, horizon: int = 32, batch: bool = True):
+        '''
+        Parameters:
+        :dedup - drop the flood messages already sent to the same neighbor
+        :hop_limit - maximum forwards of a flood, None without limit
+        :horizon - ticks a flood is remembered for dedup, at most hop_limit + 1
+            (no message of an older flood is forwarded)
+        :batch - post the fan-out of a switch as one batched record
+        '''
+
+        self.dedup = dedup
+        self.batch = batch
+        self.hop_limit = hop_limit
+        self.horizon = horizon if hop_limit is None else min(horizon, hop_limit + 1)
+        self.clear()
+
+    def clear(self) -> None:
+        # ids das mensagens postadas: (time, sender, recipient, cmd) -> (origem, seq, saltos)
+        self.__ids = {}
+        # inundações já enviadas por cada chave -> instante em que a inundação começou
+        self.__seen = {}
+        self.__seq = {}
+        # mensagens do tick em andamento
+        self.__queue = []
+        self.__context = {}
+        self.__started = {}
+        # estatísticas
+        self.posted = 0
+        self.records = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.hop_dropped = 0
+
+    def receive(self, msgs: list) -> None:
+        '''Messages received by the switch about to run its rules in this tick'''
+
+        self.__context = {}
+        self.__started = {}
+        for m in msgs:
+            fid = self.__ids.get((m['time'], m['sender'], m['recipient'], m['cmd']))
+            if fid is not None:
+                self.__context.setdefault(m['cmd'], fid)
+
+    def send(self, time: int, sender, recipient, cmd: str, value = '') -> None:
+        '''Queue a message of the switch (see receive) for the instant time'''
+
+        fid = None
+        if cmd in FLOODS:
+            fid = self.__context.get(cmd)
+            if fid is not None:
+                fid = (fid[0], fid[1], fid[2] + 1)
+                if self.hop_limit is not None and fid[2] > self.hop_limit:
+                    self.hop_dropped += 1
+                    return
+            else:
+                # nova inundação, uma por comando da chave no tick
+                fid = self.__started.get(cmd)
+                if fid is None:
+                    seq = self.__seq.get((sender, cmd), 0)
+                    self.__seq[(sender, cmd)] = seq + 1
+                    fid = (sender, seq, 0)
+                    self.__started[cmd] = fid
+            if self.dedup:
+                key = (sender, recipient, cmd, fid[0], fid[1], value)
+                if key in self.__seen:
+                    self.duplicates += 1
+                    return
+                self.__seen[key] = time - fid[2]
+        self.__queue.append(({'time':time, 'sender':sender, 'recipient':recipient, 'cmd':cmd, 'value':value}, fid))
+
+    def flush(self, blackboard) -> int:
+        '''
+        Post the messages of the tick to the blackboard
+
+        Returns:
+        :number of messages posted (recipients of the batches included)
+        '''
+
+        posted = set()
+        # mensagens seguidas da mesma chave, comando e valor
+        runs = []
+        n = 0
+        for msg, fid in self.__queue:
+            key = (msg['sender'], msg['recipient'], msg['cmd'], msg['value'])
+            if key in posted:
+                self.duplicates += 1
+                continue
+            posted.add(key)
+            if fid is not None:
+                self.__ids[(msg['time'], msg['sender'], msg['recipient'], msg['cmd'])] = fid
+            n += 1
+            last = runs[-1][0] if runs else None
+            if self.batch and last is not None and (last['sender'], last['cmd'], last['value']) == (msg['sender'], msg['cmd'], msg['value']):
+                runs[-1].append(msg)
+            else:
+                runs.append([msg])
+
+        for run in runs:
+            msg = run[0]
+            if len(run) == 1:
+                blackboard.append(msg)
+            else:
+                blackboard.post_batch(msg['time'], msg['sender'], [m['recipient'] for m in run], msg['cmd'], msg['value'])
+                self.batches += 1
+        self.records += len(runs)
+
+        if self.__queue:
+            t = self.__queue[0][0]['time']
+            # ids de ticks já lidos
+            for key in [k for k in self.__ids if k[0] < t - 1]:
+                del self.__ids[key]
+            # inundações fora do horizonte
+            for key in [k for k, start in self.__seen.items() if start <= t - self.horizon]:
+                del self.__seen[key]
+
+        self.__queue = []
+        self.posted += n
+        return n
+
+    def save(self) -> tuple:
+        '''Copy of the protocol state (see MASHSG.snapshot)'''
+
+        return (dict(self.__ids), dict(self.__seen), dict(self.__seq),
+            (self.posted, self.records, self.batches, self.duplicates, self.hop_dropped))
+
+    def load(self, state: tuple) -> None:
+        '''Go back to a state of save(), which may be loaded many times'''
+
+        ids, seen, seq, counts = state
+        self.__ids = dict(ids)
+        self.__seen = dict(seen)
+        self.__seq = dict(seq)
+        self.__queue = []
+        self.posted, self.records, self.batches, self.duplicates, self.hop_dropped = counts
+
+    def stats(self) -> dict:
+        '''Messages posted, blackboard records (batches count once), batches, duplicates and hop-limited messages dropped'''
+
+        return {'posted':self.posted, 'records':self.records, 'batches':self.batches, 'duplicates':self.duplicates, 'hop_dropped':self.hop_dropped}
@@ -0,0 +1,99 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FlowCache:
+    '''
+    LRU cache of power flow results by switch configuration
+
+    The same switch configurations come back in a restoration and between
+    the faults of a sweep (pre-fault grid, tripped breaker, isolated
+    areas). The results read by the agents (bus voltages and line
+    currents) are kept by grid, solver, closed switches, loads and fault
+    bus, up to maxsize entries, the least recently used is dropped first.
+    '''
+
+    def __init__(self, maxsize: int = 256):
+        '''
+        Parameters:
+        :maxsize - maximum number of configurations kept
+        '''
+
+        self.maxsize = maxsize
+        self.__mem = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(fingerprint: str, solver: str, closed: np.ndarray, loads: np.ndarray, fault_bus: int) -> tuple:
+        '''
+        Key of a configuration
+
+        Parameters:
+        :fingerprint - grid (net_fingerprint)
+        :solver - power flow of MASHSG
+        :closed - switch states (net.switch['closed'])
+        :loads - load powers (p_mw and q_mvar)
+        :fault_bus - fault bus, -1 before the fault
+        '''
+
+        bitmap = np.packbits(np.asarray(closed, dtype=bool)).tobytes()
+        loads = hashlib.sha1(np.ascontiguousarray(loads, dtype=float).tobytes()).hexdigest()
+        return (fingerprint, solver, len(closed), bitmap, loads, int(fault_bus))
+
+    def get(self, key: tuple) -> dict:
+        '''
+        Results of the key, None if not cached
+
+        Returns:
+        :dict with vm_pu (per bus) and i_ka (per line)
+        '''
+
+        res = self.__mem.get(key)
+        if res is None:
+            self.misses += 1
+            return None
+        self.__mem.move_to_end(key)
+        self.hits += 1
+        return res
+
+    def put(self, key: tuple, vm_pu: np.ndarray, i_ka: np.ndarray) -> None:
+        '''
+        Save the results of the key
+
+        Parameters:
+        :vm_pu - bus voltages (res_bus)
+        :i_ka - line currents (res_line)
+        '''
+
+        self.__mem[key] = {'vm_pu':np.array(vm_pu, dtype=float), 'i_ka':np.array(i_ka, dtype=float)}
+        self.__mem.move_to_end(key)
+        while len(self.__mem) > self.maxsize:
+            self.__mem.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        '''Hits, misses, evictions, entries and hit rate'''
+
+        total = self.hits + self.misses
+        return {
+            'hits':self.hits,
+            'misses':self.misses,
+            'evictions':self.evictions,
+            'size':len(self.__mem),
+            'hit_rate':self.hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        '''Forget the results and the statistics'''
+
+        self.__mem.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__mem)
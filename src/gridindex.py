@@ -0,0 +1,68 @@
+import numpy as np
+import pandapower as pp
+
+
+class GridIndex:
+    '''
+    Integer positions between the switches, lines and buses of a grid
+
+    The result tables of pandapower (res_bus, res_line) have the rows in
+    the order of net.bus and net.line, so the measurements of the switches
+    are gathered with np.take over the positions, without the label
+    alignment of pandas.
+    '''
+
+    def __init__(self, net: pp.pandapowerNet):
+        '''
+        Build the positions of the grid
+
+        Parameters:
+        :net - pandapowerNet Grid
+        '''
+
+        bus = net.bus.index
+        line = net.line.index
+        # linha de cada chave
+        self.sw_line = line.get_indexer(net.switch['element'].values)
+        # barras das linhas das chaves
+        self.sw_bus_from = bus.get_indexer(net.line['from_bus'].values[self.sw_line])
+        self.sw_bus_to = bus.get_indexer(net.line['to_bus'].values[self.sw_line])
+        # posição da coluna closed (escrita das chaves)
+        self.closed_col = net.switch.columns.get_loc('closed')
+
+    @staticmethod
+    def __take(values: np.ndarray, pos: np.ndarray, fill) -> np.ndarray:
+        out = np.take(values, pos)
+        if fill is not None:
+            out[np.isnan(out)] = fill
+        return out
+
+    def line_values(self, net: pp.pandapowerNet, column: str = 'i_ka', fill: float = None) -> np.ndarray:
+        '''
+        Column of res_line at the line of each switch
+
+        Parameters:
+        :net - pandapowerNet Grid solved
+        :column - column of res_line
+        :fill - value of the NaN results (de-energized lines), None to keep them
+        '''
+
+        return self.__take(net.res_line[column].values, self.sw_line, fill)
+
+    def bus_values(self, net: pp.pandapowerNet, column: str = 'vm_pu', fill: float = None) -> tuple:
+        '''
+        Column of res_bus at the buses (from, to) of the line of each switch
+
+        Parameters:
+        :net - pandapowerNet Grid solved
+        :column - column of res_bus
+        :fill - value of the NaN results (de-energized buses), None to keep them
+        '''
+
+        values = net.res_bus[column].values
+        return self.__take(values, self.sw_bus_from, fill), self.__take(values, self.sw_bus_to, fill)
+
+    def set_closed(self, net: pp.pandapowerNet, pos: np.ndarray, closed: np.ndarray) -> None:
+        '''Write the states of the switches at the positions pos'''
+
+        net.switch.iloc[pos, self.closed_col] = closed
@@ -0,0 +1,149 @@
+import base64
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import pandapower as pp
+import pandapower.plotting as plot
+import matplotlib.pyplot as plt
+
+# cores das áreas energizadas
+CORES = ['blue','orange','green','red','purple','cyan','pink','olive','cyan']
+
+
+class GridRenderer:
+    '''
+    Grid drawing with the static layers built once per network
+
+    The ext_grid, line and bus id layers and the annotation coordinates do
+    not change during a simulation. The switch symbols and the energized
+    areas depend only on the switch states, so they are cached by state and
+    each frame only builds the switch captions.
+    '''
+
+    def __init__(self, net: pp.pandapowerNet):
+        '''
+        Build the static layers of the grid
+
+        Parameters:
+        :net - pandapowerNet Grid
+        '''
+
+        self.net = net
+
+        self.static = [
+            plot.create_bus_collection(net, net.ext_grid.bus.values, patch_type='rect', size=20, color='pink', zorder=1),
+            plot.create_line_collection(net, net.line.index, color='grey', zorder=2),
+            ]
+
+        # posição das legendas das chaves
+        bus_id = net.switch['bus']
+        self.sw_coords = list(zip(net.bus_geodata.x.loc[bus_id].values, net.bus_geodata.y.loc[bus_id].values))
+
+        # legenda das barras
+        barras = [str(b) for b in net.bus.index]
+        barCoor = zip(net.bus_geodata.x.values, net.bus_geodata.y.values)
+        self.bus_ids = plot.create_annotation_collection(texts=barras, coords=barCoor, size=20, color='navy', zorder=5)
+
+        self.nogobuses = set(net.trafo.lv_bus.values) | set(net.trafo.hv_bus.values)
+
+        # camadas por estado das chaves
+        self.__layers = {}
+
+    def __state_layers(self) -> list:
+        '''Energized areas and switch symbols of the current switch states'''
+
+        net = self.net
+        key = net.switch['closed'].values.astype(bool).tobytes()
+        layers = self.__layers.get(key)
+        if layers is None:
+            layers = []
+            mg = pp.topology.create_nxgraph(net, nogobuses=self.nogobuses)
+            for c, area in zip(CORES, pp.topology.connected_components(mg)):
+                layers.append(plot.create_bus_collection(net, area, size=5, color=c, zorder=3))
+            layers.append(plot.create_line_switch_collection(net,size=30,distance_to_bus=40, color='black', zorder=4))
+            self.__layers[key] = layers
+        return layers
+
+    def frame(self, captions, draw_bus_id: bool = False, destination = None) -> str:
+        '''
+        Draw the grid with the switch states of net
+
+        Parameters:
+        :captions - text of each switch (None to omit)
+        :draw_bus_id - write the bus ids
+        :destination - None (show), "HTML" (<img> tag) or file name
+        '''
+
+        collections = list(self.static)
+        collections.extend(self.__state_layers())
+
+        if captions is not None and None not in captions:
+            collections.append(plot.create_annotation_collection(texts=captions, coords=self.sw_coords, size=30, color='grey', zorder=5))
+
+        if draw_bus_id:
+            collections.append(self.bus_ids)
+
+        plot.draw_collections(collections)
+        if destination == None:
+            plt.show()
+            return ''
+        elif destination == 'HTML':
+            s = io.BytesIO()
+            plt.savefig(s,  format='png')
+            plt.close()
+            img = base64.b64encode(s.getvalue()).decode("utf-8").replace("\n", "")
+            return '<img src="data:image/png;base64, %s">' % img
+        else:
+            plt.savefig(destination)
+            plt.close()
+            return ''
+
+
+# renderizador de cada processo (worker)
+_renderer = None
+
+
+def _init_worker(net: pp.pandapowerNet) -> None:
+    global _renderer
+    _renderer = GridRenderer(net)
+
+
+def _render(job: tuple) -> str:
+    net_closed, captions, draw_bus_id, destination = job
+    _renderer.net.switch['closed'] = net_closed
+    return _renderer.frame(captions, draw_bus_id, destination)
+
+
+def frame_pool(net: pp.pandapowerNet, processes: int = None) -> ProcessPoolExecutor:
+    '''
+    Process pool with one GridRenderer per worker
+
+    Parameters:
+    :net - pandapowerNet Grid
+    :processes - number of worker processes, default cpu count
+    '''
+
+    return ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(net,))
+
+
+def render_frames(net: pp.pandapowerNet, jobs: list, processes: int = None, pool: ProcessPoolExecutor = None) -> list:
+    '''
+    Draw several frames in worker processes
+
+    Parameters:
+    :net - pandapowerNet Grid
+    :jobs - list of (net_closed, captions, draw_bus_id, destination)
+    :processes - number of worker processes, default cpu count
+    :pool - pool made by frame_pool to reuse, default a new one
+
+    Returns:
+    :list with the result of GridRenderer.frame of each job
+    '''
+
+    if len(jobs) == 0:
+        return []
+    chunksize = max(1, len(jobs) // ((processes or 1) * 4))
+    if pool is not None:
+        return list(pool.map(_render, jobs, chunksize=chunksize))
+    with frame_pool(net, processes) as pool:
+        return list(pool.map(_render, jobs, chunksize=chunksize))
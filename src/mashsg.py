@@ -1,9 +1,10 @@
 import pandapower as pp
 import pandapower.plotting as plot
 import matplotlib.pyplot as plt
-import networkx as nx
 import pandas as pd
 
+from switchteams import neighbor_teams
+
 class MASHSG:
     """Distributed Intelligent System for SelfHealing in Smart Grids"""
 
@@ -29,43 +30,9 @@ class MASHSG:
         ssw['line'] = net.switch['element']
 
         # Calculando TIMES(Grupos)
-        G = pp.topology.create_nxgraph(net,respect_switches=False)
-        grupos_de=[]
-        grupos_para=[]
-        for sw_id, sw in net.switch.iterrows():
-            #Busca em profundidade
-            paths = nx.single_source_shortest_path(G,sw['bus'])
-            # indices das chaves encontradas
-            gd = []
-            gp = []
-            for k in paths:
-                p = paths[k]
-                # analisa caminho para encontra próxima chave
-                dp = False
-                for n in range(len(p)-1):
-                    # informações da aresta (linha)
-                    aresta = list(G[p[n]][p[n+1]].keys())
-                    tipo = aresta[0][0]      
-                    ln_id = aresta[0][1]
-                    if (tipo != 'line'):
-                        continue  
-                    if (ln_id == sw['element']):
-                        dp=True
-                        continue
-                    if (ln_id in net.switch['element'].values): # tem chave?
-                        sw_v = net.switch.loc[net.switch['element'] == ln_id].index[0]
-                        #grupo
-                        if (dp):
-                            if (sw_v not in gp):
-                                gp.append(sw_v)
-                        else:
-                            if (sw_v not in gd):
-                                gd.append(sw_v)
-                        break
-            grupos_de.append(dict.fromkeys(gd,{}))
-            grupos_para.append(dict.fromkeys(gp,{}))
-            del gd
-            del gp
+        grupos_para, grupos_de = neighbor_teams(net)
+        grupos_de = [dict.fromkeys(gd,{}) for gd in grupos_de]
+        grupos_para = [dict.fromkeys(gp,{}) for gp in grupos_para]
         
         ssw['nb_from'] = grupos_para #time para
         ssw['nb_to'] = grupos_de #time de
@@ -0,0 +1,205 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+from switchteams import neighbor_teams
+
+# parâmetros elétricos das linhas sem std_type
+_LINE_PARAMS = ['r_ohm_per_km', 'x_ohm_per_km', 'c_nf_per_km', 'max_i_ka']
+# versão do arquivo de cache
+_CACHE_VERSION = 1
+
+
+def read_table(table) -> pd.DataFrame:
+    '''
+    Table as DataFrame
+
+    Parameters:
+    :table - DataFrame, .csv or .parquet file name, or None
+    '''
+
+    if table is None or isinstance(table, pd.DataFrame):
+        return table
+    if str(table).endswith('.parquet'):
+        return pd.read_parquet(table)
+    return pd.read_csv(table)
+
+
+def _column(df: pd.DataFrame, name: str, default):
+    return df[name].values if name in df else default
+
+
+def net_from_tables(
+    buses,
+    lines,
+    switches,
+    loads = None,
+    ext_grids = None,
+    std_type: str = '15-AL1/3-ST1A 0.4',
+    ) -> pp.pandapowerNet:
+    '''
+    Build the grid from tables with the vectorized create functions
+
+    Columns (optional ones in brackets):
+    :buses - id, vn_kv, [name, x, y]
+    :lines - from_bus, to_bus, length_km, [id, std_type] or [r_ohm_per_km,
+        x_ohm_per_km, c_nf_per_km, max_i_ka]
+    :switches - bus, element (line id), [closed, type, name]
+    :loads - bus, p_mw, [q_mvar, name]
+    :ext_grids - bus, [vm_pu, va_degree, name]
+
+    Parameters:
+    :buses, lines, switches, loads, ext_grids - DataFrame, .csv or .parquet
+    :std_type - line type of the lines without std_type or parameters
+    '''
+
+    buses = read_table(buses)
+    lines = read_table(lines)
+    switches = read_table(switches)
+    loads = read_table(loads)
+    ext_grids = read_table(ext_grids)
+
+    net = pp.create_empty_network()
+
+    # == Barras ==
+    geodata = None
+    if 'x' in buses and 'y' in buses:
+        geodata = list(zip(buses['x'].values, buses['y'].values))
+    pp.create_buses(net, len(buses), buses['vn_kv'].values,
+        index=buses['id'].values,
+        name=_column(buses, 'name', None),
+        geodata=geodata,
+        )
+
+    # == Linhas ==
+    index = _column(lines, 'id', None)
+    if all(c in lines for c in _LINE_PARAMS):
+        pp.create_lines_from_parameters(net, lines['from_bus'].values, lines['to_bus'].values, lines['length_km'].values,
+            *[lines[c].values for c in _LINE_PARAMS], index=index)
+    elif 'std_type' in lines and lines['std_type'].nunique() > 1:
+        # um grupo por tipo de linha
+        for st, grp in lines.groupby('std_type', sort=False):
+            pp.create_lines(net, grp['from_bus'].values, grp['to_bus'].values, grp['length_km'].values, st,
+                index=_column(grp, 'id', None))
+    else:
+        st = lines['std_type'].iloc[0] if 'std_type' in lines and len(lines) else std_type
+        pp.create_lines(net, lines['from_bus'].values, lines['to_bus'].values, lines['length_km'].values, st, index=index)
+
+    # == Chaves ==
+    pp.create_switches(net, switches['bus'].values, switches['element'].values, 'l',
+        closed=_column(switches, 'closed', np.ones(len(switches), dtype=bool)).astype(bool),
+        type=_column(switches, 'type', None),
+        name=_column(switches, 'name', None),
+        )
+
+    # == Cargas ==
+    if loads is not None and len(loads):
+        pp.create_loads(net, loads['bus'].values, loads['p_mw'].values,
+            q_mvar=_column(loads, 'q_mvar', 0),
+            name=_column(loads, 'name', None),
+            )
+
+    # == Subestações ==
+    if ext_grids is not None and len(ext_grids):
+        eg = pd.DataFrame({
+            'name':_column(ext_grids, 'name', None),
+            'bus':ext_grids['bus'].values,
+            'vm_pu':_column(ext_grids, 'vm_pu', 1.0),
+            'va_degree':_column(ext_grids, 'va_degree', 0.0),
+            'slack_weight':1.0,
+            'in_service':True,
+            })
+        net.ext_grid = pd.concat([net.ext_grid, eg.astype(net.ext_grid.dtypes[eg.columns])], ignore_index=True)
+
+    return net
+
+
+def save_tables(net: pp.pandapowerNet, directory: str, fmt: str = 'csv') -> None:
+    '''
+    Write the tables of net_from_tables (buses, lines, switches, loads, ext_grids)
+
+    Parameters:
+    :net - pandapowerNet Grid
+    :directory - destination directory
+    :fmt - "csv" or "parquet"
+    '''
+
+    os.makedirs(directory, exist_ok=True)
+    buses = pd.DataFrame({'id':net.bus.index, 'vn_kv':net.bus['vn_kv'].values, 'name':net.bus['name'].values})
+    if len(net.bus_geodata):
+        geo = net.bus_geodata.reindex(net.bus.index)
+        buses['x'] = geo['x'].values
+        buses['y'] = geo['y'].values
+    tables = {
+        'buses':buses,
+        'lines':net.line.reset_index().rename(columns={'index':'id'})[['id', 'from_bus', 'to_bus', 'length_km', 'std_type'] + _LINE_PARAMS],
+        'switches':net.switch[['bus', 'element', 'closed', 'type', 'name']],
+        'loads':net.load[['bus', 'p_mw', 'q_mvar', 'name']],
+        'ext_grids':net.ext_grid[['bus', 'vm_pu', 'va_degree', 'name']],
+        }
+    for name, df in tables.items():
+        path = os.path.join(directory, f'{name}.{fmt}')
+        if fmt == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+
+
+def save_cache(path: str, net: pp.pandapowerNet, teams: tuple = None) -> None:
+    '''
+    Save the grid and its neighbor teams in a binary (pickle) file
+
+    Parameters:
+    :path - cache file
+    :net - pandapowerNet Grid
+    :teams - neighbor teams (neighbor_teams), computed if None
+    '''
+
+    if teams is None:
+        teams = neighbor_teams(net)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump({'version':_CACHE_VERSION, 'net':net, 'teams':teams}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_cache(path: str) -> tuple:
+    '''
+    Load a file of save_cache
+
+    Returns:
+    :(net, teams)
+    '''
+
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    if data.get('version') != _CACHE_VERSION:
+        raise ValueError(f'cache {path} has version {data.get("version")}, expected {_CACHE_VERSION}')
+    return data['net'], data['teams']
+
+
+def cached_net(path: str, build, sources: list = ()) -> tuple:
+    '''
+    Grid and neighbor teams from the cache, built and saved if it is missing or old
+
+    Parameters:
+    :path - cache file
+    :build - function without arguments that returns the pandapowerNet
+    :sources - files of the grid, the cache is rebuilt when one is newer
+
+    Returns:
+    :(net, teams)
+    '''
+
+    if os.path.exists(path):
+        mtime = os.path.getmtime(path)
+        if all(os.path.getmtime(s) <= mtime for s in sources):
+            return load_cache(path)
+
+    net = build()
+    teams = neighbor_teams(net)
+    save_cache(path, net, teams)
+    return net, teams
@@ -0,0 +1,106 @@
+import json
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class Profiler:
+    '''
+    Wall time of the phases of a simulation and event counters
+
+    The phases (e.g. "pflow", "rules", "level2", "draw", "report") are
+    timed with phase(), the counters are increased with count() and each
+    end_step() closes one row of the per-step table. Phase times are
+    inclusive: "report" also contains the "draw" of its images.
+
+    Callbacks are called as callback(event, name, data):
+    :("phase_start", phase, None)
+    :("phase_end", phase, elapsed seconds)
+    :("step", t, row dict)
+    '''
+
+    def __init__(self, callbacks: list = None):
+        '''
+        Parameters:
+        :callbacks - functions callback(event, name, data)
+        '''
+
+        self.callbacks = list(callbacks) if callbacks is not None else []
+        self.clear()
+
+    def clear(self) -> None:
+        # linhas por passo
+        self.rows = []
+        # totais acumulados (tempo por fase e contadores)
+        self.time = {}
+        self.counters = {}
+        # passo em andamento
+        self.__time = {}
+        self.__counters = {}
+
+    def add_callback(self, callback) -> None:
+        self.callbacks.append(callback)
+
+    def __emit(self, event: str, name, data) -> None:
+        for callback in self.callbacks:
+            callback(event, name, data)
+
+    @contextmanager
+    def phase(self, name: str):
+        '''Time the block as the phase name'''
+
+        if self.callbacks:
+            self.__emit('phase_start', name, None)
+        ini = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - ini
+            self.__time[name] = self.__time.get(name, 0.0) + elapsed
+            self.time[name] = self.time.get(name, 0.0) + elapsed
+            if self.callbacks:
+                self.__emit('phase_end', name, elapsed)
+
+    def count(self, name: str, n: int = 1) -> None:
+        '''Increase the counter name'''
+
+        self.__counters[name] = self.__counters.get(name, 0) + n
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def end_step(self, t: int) -> dict:
+        '''Close the row of step t with the phases and counters since the last row'''
+
+        row = {'step':t}
+        row.update({f'{name}_s':v for name, v in self.__time.items()})
+        row.update(self.__counters)
+        self.rows.append(row)
+        self.__time = {}
+        self.__counters = {}
+        if self.callbacks:
+            self.__emit('step', t, row)
+        return row
+
+    def to_frame(self) -> pd.DataFrame:
+        '''Per-step table, one column per phase (seconds) and counter'''
+
+        return pd.DataFrame(self.rows).set_index('step').fillna(0) if self.rows else pd.DataFrame()
+
+    def totals(self) -> dict:
+        '''Cumulative time of each phase (seconds) and counters'''
+
+        return {'time':dict(self.time), 'counters':dict(self.counters)}
+
+    def to_json(self, path: str = None) -> str:
+        '''
+        Export the totals and the per-step rows as JSON
+
+        Parameters:
+        :path - file to write, None to only return the text
+        '''
+
+        text = json.dumps({'totals':self.totals(), 'steps':self.rows}, default=float)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
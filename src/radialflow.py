@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+import pandapower as pp
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import splu
+
+
+class RadialFlowError(Exception):
+    '''Grid that the radial sweep cannot solve (meshed or unsupported elements)'''
+
+
+# elementos que o fluxo radial não modela
+_UNSUPPORTED = ['trafo', 'trafo3w', 'impedance', 'gen', 'shunt', 'ward', 'xward', 'dcline', 'storage', 'svc', 'tcsc',
+    'asymmetric_load', 'asymmetric_sgen', 'motor']
+
+
+class RadialFlow:
+    '''
+    Backward/forward sweep power flow for radial grids
+
+    The closed lines form a tree rooted at each ext_grid. The branch
+    currents are the sum of the load currents below each branch (backward)
+    and the bus voltages are the source voltage minus the drops along the
+    path (forward). Both sweeps are a sparse triangular solve with a
+    factorization that is reused while the switch states do not change.
+    Loads are constant power only (const_z_percent and const_i_percent
+    zero). Only bus voltages (res_bus) and line currents (res_line) are
+    computed.
+    '''
+
+    def __init__(self, net: pp.pandapowerNet):
+        '''
+        Prepare the static data of the grid
+
+        Parameters:
+        :net - pandapowerNet Grid
+        '''
+
+        for elm in _UNSUPPORTED:
+            if elm in net and len(net[elm]) > 0 and net[elm]['in_service'].any():
+                raise RadialFlowError(f'element {elm} is not supported by the radial sweep')
+        if (net.switch['et'] != 'l').any():
+            raise RadialFlowError('only line switches are supported by the radial sweep')
+
+        self.bus_ids = net.bus.index
+        nb = len(net.bus)
+        ln = net.line
+
+        # linhas: barras (posição), impedância série (ohm) e admitância shunt (S)
+        self.f = self.bus_ids.get_indexer(ln['from_bus'].values)
+        self.t = self.bus_ids.get_indexer(ln['to_bus'].values)
+        length = ln['length_km'].values / ln['parallel'].values
+        self.z = (ln['r_ohm_per_km'].values + 1j * ln['x_ohm_per_km'].values) * length
+        omega = 2 * np.pi * net.f_hz
+        self.y = (ln['g_us_per_km'].values * 1e-6 + 1j * omega * ln['c_nf_per_km'].values * 1e-9) * ln['length_km'].values * ln['parallel'].values
+        self.line_in_service = ln['in_service'].values.astype(bool) & net.bus['in_service'].values[self.f] & net.bus['in_service'].values[self.t]
+        self.i_max = ln['max_i_ka'].values * ln['df'].values * ln['parallel'].values
+
+        # chaves de linha
+        self.sw_line = ln.index.get_indexer(net.switch['element'].values)
+
+        # barras
+        self.vn_kv = net.bus['vn_kv'].values
+        eg = net.ext_grid.loc[net.ext_grid['in_service'].astype(bool)]
+        self.src = self.bus_ids.get_indexer(eg['bus'].values)
+        self.v_src = eg['vm_pu'].values * self.vn_kv[self.src] / np.sqrt(3) * np.exp(1j * np.deg2rad(eg['va_degree'].values))
+        self.nb = nb
+
+        # topologia da última solução
+        self.__key = None
+        self.iterations = 0
+
+    def __build(self, line_on: np.ndarray) -> None:
+        '''Trees of the closed lines and factorization of the sweep matrix'''
+
+        nb = self.nb
+        on = np.flatnonzero(line_on)
+        f, t = self.f[on], self.t[on]
+
+        # grafo das barras com a linha (posição + 1) como peso
+        A = sp.csr_matrix((on + 1, (f, t)), shape=(nb, nb))
+        A = A + A.T
+        ncomp, label = csgraph.connected_components(A, directed=False)
+
+        # cada componente energizada deve ser uma árvore com uma única fonte
+        src_comp = label[self.src]
+        if len(np.unique(src_comp)) < len(src_comp):
+            raise RadialFlowError('two ext_grids in the same island')
+        n_bus = np.bincount(label, minlength=ncomp)
+        n_line = np.bincount(label[f], minlength=ncomp)
+        if (n_line[src_comp] != n_bus[src_comp] - 1).any():
+            raise RadialFlowError('meshed island')
+
+        # ordem de busca em largura a partir de uma raiz virtual ligada às fontes
+        root = nb
+        R = sp.csr_matrix((np.ones(len(self.src)), (np.full(len(self.src), root), self.src)), shape=(nb + 1, nb + 1))
+        G = sp.bmat([[A, None], [None, sp.csr_matrix((1, 1))]], format='csr') + R + R.T
+        o, p = csgraph.breadth_first_order(G, root, directed=False, return_predecessors=True)
+        is_src = np.zeros(nb + 1, dtype=bool)
+        is_src[self.src] = True
+        o = o[1:]
+        o = o[~is_src[o]].astype(np.int64)
+        child = o
+        parent = p[o].astype(np.int64)
+
+        # linha (ramo) que chega em cada barra filha
+        branch_line = np.asarray(A[parent, child]).ravel().astype(np.int64) - 1
+
+        # ramo pai de cada ramo (-1 se o pai é a fonte)
+        br_of_bus = np.full(nb, -1, dtype=np.int64)
+        br_of_bus[child] = np.arange(len(child))
+        parent_br = br_of_bus[parent]
+
+        # M = I - C, com C[ramo pai, ramo filho] = 1
+        n = len(child)
+        k = np.flatnonzero(parent_br >= 0)
+        M = sp.identity(n, dtype=complex, format='csc') - sp.csc_matrix((np.ones(len(k), dtype=complex), (parent_br[k], k)), shape=(n, n))
+
+        self.child = child
+        self.parent = parent
+        self.branch_line = branch_line
+        self.parent_br = parent_br
+        self.energized = np.zeros(nb, dtype=bool)
+        self.energized[self.src] = True
+        self.energized[child] = True
+        self.lu = splu(M, permc_spec='NATURAL') if n > 0 else None
+
+        # tensão da fonte de cada barra
+        v_comp = np.zeros(ncomp, dtype=complex)
+        v_comp[src_comp] = self.v_src
+        self.v_flat = np.where(self.energized, v_comp[label], 0)
+
+        # shunt das linhas (metade em cada extremidade)
+        y_bus = np.zeros(nb, dtype=complex)
+        np.add.at(y_bus, f, self.y[on] / 2)
+        np.add.at(y_bus, t, self.y[on] / 2)
+        self.y_bus = y_bus
+
+    def run(self, net: pp.pandapowerNet, tol: float = 1e-9, max_iter: int = 30) -> None:
+        '''
+        Solve the grid and write net.res_bus (vm_pu, va_degree) and net.res_line (i_ka)
+
+        Parameters:
+        :net - pandapowerNet Grid
+        :tol - voltage tolerance (pu)
+        :max_iter - iteration limit
+        '''
+
+        # linhas fechadas
+        line_on = self.line_in_service.copy()
+        closed = net.switch['closed'].values.astype(bool)
+        line_on[self.sw_line[~closed]] = False
+
+        key = line_on.tobytes()
+        if key != self.__key:
+            self.__build(line_on)
+            self.__key = key
+
+        # potência das cargas por barra (MVA trifásico)
+        s_bus = np.zeros(self.nb, dtype=complex)
+        for elm, sign in (('load', 1), ('sgen', -1)):
+            tb = net[elm]
+            if len(tb) == 0:
+                continue
+            on = tb['in_service'].values.astype(bool)
+            if elm == 'load':
+                zi = [c for c in ('const_z_percent', 'const_i_percent') if c in tb]
+                if zi and (tb[zi].values[on] != 0).any():
+                    raise RadialFlowError('only constant power loads are supported by the radial sweep')
+            s = (tb['p_mw'].values + 1j * tb['q_mvar'].values) * tb['scaling'].values * sign
+            np.add.at(s_bus, self.bus_ids.get_indexer(tb['bus'].values[on]), s[on])
+
+        child = self.child
+        z_br = self.z[self.branch_line]
+        v_root = np.where(self.parent_br < 0, self.v_flat[self.parent], 0)
+        v = self.v_flat.copy()
+        v_base = self.vn_kv / np.sqrt(3)
+
+        self.iterations = 0
+        while self.lu is not None and self.iterations < max_iter:
+            self.iterations += 1
+            # backward: correntes das cargas (kA por fase) somadas nos ramos
+            i_inj = np.conj(s_bus[child] / 3 / v[child]) + self.y_bus[child] * v[child]
+            i_br = self.lu.solve(i_inj)
+            # forward: quedas de tensão a partir da fonte
+            v_new = self.lu.solve(v_root - z_br * i_br, trans='T')
+            dv = np.abs(v_new - v[child]) / v_base[child]
+            v[child] = v_new
+            if dv.max() < tol:
+                break
+
+        # == Resultados ==
+        vm = np.where(self.energized, np.abs(v) / v_base, np.nan)
+        va = np.where(self.energized, np.rad2deg(np.angle(v)), np.nan)
+        net['res_bus'] = pd.DataFrame({'vm_pu':vm, 'va_degree':va}, index=self.bus_ids)
+
+        i_ka = np.zeros(len(self.z))
+        if self.lu is not None:
+            half = self.y[self.branch_line] / 2
+            i_from = np.abs(i_br + half * v[self.parent])
+            i_to = np.abs(i_br - half * v[child])
+            i_ka[self.branch_line] = np.maximum(i_from, i_to)
+        else:
+            i_br = np.zeros(0, dtype=complex)
+        net['res_line'] = pd.DataFrame({'i_ka':i_ka, 'loading_percent':i_ka / self.i_max * 100}, index=net.line.index)
+
+        # solução usada por load_sweep
+        self.v = v
+        self.i_br = i_br
+
+    def load_sweep(self, bus_pos: np.ndarray, s_add: np.ndarray, lines: np.ndarray, iters: int = 3, block: int = 256) -> np.ndarray:
+        '''
+        Line currents after adding a load at each bus, one scenario per bus
+
+        Superposition on the last solution (run): the current of the added
+        load, with the voltage of its bus corrected by the path impedance,
+        flows through every branch between the bus and its source. The other
+        load currents are kept. All scenarios are solved together by the
+        sweep factorization, in blocks of columns.
+
+        Parameters:
+        :bus_pos - bus position (in net.bus) of each scenario
+        :s_add - added power (MVA, three-phase) of each scenario
+        :lines - line positions (in net.line) of the result rows
+        :iters - iterations of the bus voltage correction
+        :block - scenarios solved at once
+
+        Returns:
+        :array (lines x scenarios) of line currents (kA)
+        '''
+
+        lines = np.asarray(lines, dtype=np.int64)
+        bus_pos = np.asarray(bus_pos, dtype=np.int64)
+        s_add = np.asarray(s_add, dtype=complex)
+        out = np.zeros((len(lines), len(bus_pos)))
+        if self.lu is None:
+            return out
+
+        # ramo de cada linha (-1 se aberta) e de cada barra
+        br_of_line = np.full(len(self.z), -1, dtype=np.int64)
+        br_of_line[self.branch_line] = np.arange(len(self.branch_line))
+        br_of_bus = np.full(self.nb, -1, dtype=np.int64)
+        br_of_bus[self.child] = np.arange(len(self.child))
+        rows = br_of_line[lines]
+        on = rows >= 0
+
+        # correntes da solução base nas linhas pedidas
+        half = self.y[self.branch_line] / 2
+        i_from = self.i_br + half * self.v[self.parent]
+        i_to = self.i_br - half * self.v[self.child]
+        out[on] = np.maximum(np.abs(i_from[rows[on]]), np.abs(i_to[rows[on]]))[:, None]
+
+        # impedância do caminho da fonte até cada barra
+        z_path = self.lu.solve(self.z[self.branch_line], trans='T')
+
+        br = br_of_bus[bus_pos]
+        k = np.flatnonzero(br >= 0)
+        if len(k) == 0:
+            return out
+
+        # corrente da carga acrescentada, com a tensão da barra corrigida
+        v0 = self.v[bus_pos[k]]
+        zb = z_path[br[k]]
+        i_add = np.zeros(len(k), dtype=complex)
+        for _ in range(iters):
+            i_add = np.conj(s_add[k] / 3 / (v0 - zb * i_add))
+
+        n = len(self.child)
+        for k0 in range(0, len(k), block):
+            kk = np.arange(k0, min(k0 + block, len(k)))
+            rhs = np.zeros((n, len(kk)), dtype=complex)
+            rhs[br[k[kk]], np.arange(len(kk))] = i_add[kk]
+            d_br = self.lu.solve(rhs)[rows[on]]
+            cols = k[kk]
+            out[np.ix_(on, cols)] = np.maximum(np.abs(i_from[rows[on]][:, None] + d_br), np.abs(i_to[rows[on]][:, None] + d_br))
+        return out
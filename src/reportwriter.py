@@ -0,0 +1,76 @@
+import os
+
+
+class ReportWriter:
+    '''
+    Streaming sink of the HTML report
+
+    Each frame is written to the target as soon as it is rendered, so the
+    report is never kept in memory. The images are inline base64 <img> tags
+    or, when imageDir is given, PNG files referenced by the report.
+    '''
+
+    def __init__(self, target, imageDir: str = None):
+        '''
+        Open the report
+
+        Parameters:
+        :target - file name or file-like object with write()
+        :imageDir - directory of the PNG images, None to embed them in the HTML
+        '''
+
+        if hasattr(target, 'write'):
+            self.file = target
+            self.__own = False
+            base = os.getcwd()
+        else:
+            self.file = open(target, 'w', encoding='utf-8', newline='')
+            self.__own = True
+            base = os.path.dirname(os.path.abspath(target))
+
+        self.imageDir = imageDir
+        if imageDir is not None:
+            os.makedirs(imageDir, exist_ok=True)
+            # caminho das imagens relativo ao relatório
+            self.__imageRef = os.path.relpath(os.path.abspath(imageDir), base)
+        # imagens gravadas
+        self.images = 0
+
+    def write(self, lines: list) -> None:
+        '''Write the lines of one frame'''
+
+        for line in lines:
+            self.file.write(line)
+            self.file.write('\r\n')
+
+    def image(self) -> tuple:
+        '''
+        Reserve the next image file
+
+        Returns:
+        :(file name, <img> tag) or None when the images are inline
+        '''
+
+        if self.imageDir is None:
+            return None
+        name = 'frame%05d.png' % self.images
+        self.images += 1
+        ref = os.path.join(self.__imageRef, name).replace(os.sep, '/')
+        return os.path.join(self.imageDir, name), '<img src="%s">' % ref
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        '''Close the report file (a file-like target is only flushed)'''
+
+        if self.__own:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,112 @@
+import pandapower as pp
+import networkx as nx
+
+# estado do caminho até cada barra na busca a partir de uma chave
+_DE, _PARA, _FIM = 0, 1, 2
+
+
+def _ranks(adj, bus, own, sw_line: dict) -> tuple:
+    '''
+    Discovery order of the neighbor switches of one switch, breadth-first from its bus
+
+    As the shortest paths of the original discovery, a path records the
+    first switch it crosses, in the team PARA after the own line and in the
+    team DE before it. A path is never extended past a switch, so the search
+    only walks the two segments of the own line.
+
+    Returns:
+    :(rank PARA, rank DE) - dicts switch id -> discovery position
+    '''
+
+    rank = ({}, {})
+    state = {bus:_DE}
+    level = [bus]
+    while level:
+        nxt = []
+        for v in level:
+            sv = state[v]
+            for w, keys in adj[v].items():
+                if w in state:
+                    continue
+                s = sv
+                tipo, ln_id = next(iter(keys))[:2]
+                if tipo == 'line':
+                    if ln_id == own:
+                        s = _PARA
+                    elif ln_id in sw_line:
+                        r = rank[0] if sv == _PARA else rank[1]
+                        r.setdefault(sw_line[ln_id], len(r))
+                        state[w] = _FIM
+                        continue
+                state[w] = s
+                nxt.append(w)
+        level = nxt
+    return rank
+
+
+def neighbor_teams(net: pp.pandapowerNet) -> tuple:
+    '''
+    Find the neighbor teams of every switch in a single pass over the grid
+
+    The lines with a switch split the grid in segments. Each segment is
+    contracted to one node of a switch-adjacency graph, so the neighbors of
+    a switch are the other switches touching the segment of each side of
+    its own line. Each team is then ranked in the breadth-first order of
+    the original discovery, by a search from the switch bus that stays in
+    the two segments of its line.
+
+    Parameters:
+    :net - pandapowerNet Grid
+
+    Returns:
+    :nb_from - list (aligned with net.switch) of switch ids after the own line
+    :nb_to - list (aligned with net.switch) of switch ids before the own line
+    '''
+
+    G = pp.topology.create_nxgraph(net, respect_switches=False)
+
+    # primeira chave de cada linha (elemento)
+    sw_line = {}
+    for sw_id, ln_id in zip(net.switch.index, net.switch['element'].values):
+        sw_line.setdefault(ln_id, sw_id)
+
+    # == Contraindo os trechos entre chaves ==
+    # grafo sem as linhas com chave, cada componente é um trecho
+    S = nx.Graph()
+    S.add_nodes_from(G.nodes)
+    chaveadas = []
+    for u, v, key in G.edges(keys=True):
+        tipo, ln_id = key[0], key[1]
+        if tipo == 'line' and ln_id in sw_line:
+            chaveadas.append((u, v, ln_id))
+        else:
+            S.add_edge(u, v)
+
+    trecho = {}
+    for n, comp in enumerate(nx.connected_components(S)):
+        for bus in comp:
+            trecho[bus] = n
+
+    # chaves que tocam cada trecho
+    tocam = {}
+    for u, v, ln_id in chaveadas:
+        sw_v = sw_line[ln_id]
+        for tr in {trecho[u], trecho[v]}:
+            tocam.setdefault(tr, []).append((sw_v, ln_id))
+
+    # == Times de cada chave ==
+    grupos_de = []
+    grupos_para = []
+    for bus, ln_id in zip(net.switch['bus'].values, net.switch['element'].values):
+        f_bus, t_bus = net.line.at[ln_id, 'from_bus'], net.line.at[ln_id, 'to_bus']
+        outro = t_bus if bus == f_bus else f_bus
+        # lado da chave (DE) e lado oposto da própria linha (PARA)
+        gd = [sw_v for sw_v, ln_v in tocam.get(trecho.get(bus), []) if ln_v != ln_id]
+        gp = [sw_v for sw_v, ln_v in tocam.get(trecho.get(outro), []) if ln_v != ln_id]
+        # ordem da busca em largura (as que ela não alcança no fim, na ordem das chaves)
+        rank_p, rank_d = _ranks(G.adj, bus, ln_id, sw_line)
+        end = len(sw_line)
+        grupos_de.append(sorted(dict.fromkeys(gd), key=lambda k: (rank_d.get(k, end), k)))
+        grupos_para.append(sorted(dict.fromkeys(gp), key=lambda k: (rank_p.get(k, end), k)))
+
+    return grupos_para, grupos_de
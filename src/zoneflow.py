@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+import pandapower as pp
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from radialflow import RadialFlow, RadialFlowError
+
+
+class ZoneFlow:
+    '''
+    Power flow split in feeder zones, solving only the zones that changed
+
+    The zones are the islands of the grid with the switches open at the
+    start (the tie switches) taken out, one per substation feeder. The
+    closed tie switches join zones in clusters that are solved together.
+    Each cluster keeps its results while the switches and loads of its
+    zones do not change, so a step only solves the disturbed feeders.
+    When most zones changed the whole grid is solved at once.
+    '''
+
+    def __init__(self, net: pp.pandapowerNet, solver: str = 'pandapower', ties: np.ndarray = None, full_ratio: float = 0.5):
+        '''
+        Split the grid in zones
+
+        Parameters:
+        :net - pandapowerNet Grid
+        :solver - "pandapower" or "radial" (falls back to pp.runpp when meshed)
+        :ties - positions (in net.switch) of the tie switches, default the open ones
+        :full_ratio - fraction of changed zones from which the whole grid is solved
+        '''
+
+        self.solver = solver
+        self.full_ratio = full_ratio
+
+        bus_ids = net.bus.index
+        nb = len(bus_ids)
+        f = bus_ids.get_indexer(net.line['from_bus'].values)
+        t = bus_ids.get_indexer(net.line['to_bus'].values)
+        sw_line = net.line.index.get_indexer(net.switch['element'].values)
+        if ties is None:
+            ties = np.flatnonzero(~net.switch['closed'].values.astype(bool))
+        ties = np.asarray(ties, dtype=np.int64)
+
+        # == Zonas: ilhas sem as linhas das chaves de interligação ==
+        keep = np.ones(len(f), dtype=bool)
+        keep[sw_line[ties]] = False
+        A = sp.csr_matrix((np.ones(keep.sum()), (f[keep], t[keep])), shape=(nb, nb))
+        self.n_zones, self.bus_zone = csgraph.connected_components(A, directed=False)
+        self.line_zone = self.bus_zone[f]
+
+        # interligações entre zonas diferentes
+        zf, zt = self.bus_zone[f[sw_line[ties]]], self.bus_zone[t[sw_line[ties]]]
+        cross = zf != zt
+        self.ties = ties[cross]
+        self.tie_zones = np.stack((zf[cross], zt[cross]), axis=1)
+        self.tie_line = sw_line[self.ties]
+        self.tie_bus = np.stack((f[self.tie_line], t[self.tie_line]), axis=1)
+
+        # zona de cada chave e de cada carga (interligação na zona DE)
+        self.switch_zone = self.line_zone[sw_line]
+        self.switch_zone[self.ties] = self.tie_zones[:, 0]
+        self.load_zone = self.bus_zone[bus_ids.get_indexer(net.load['bus'].values)]
+        eg = net.ext_grid['in_service'].values.astype(bool)
+        self.has_source = np.zeros(self.n_zones, dtype=bool)
+        self.has_source[self.bus_zone[bus_ids.get_indexer(net.ext_grid['bus'].values[eg])]] = True
+
+        # subredes já montadas, por conjunto de zonas
+        self.__subnets = {}
+        self.__radial = None
+        self.__closed = None
+        self.__loads = None
+        self.__res = None
+        # zonas resolvidas no último run
+        self.solved = 0
+
+    def clusters(self, closed: np.ndarray) -> np.ndarray:
+        '''Cluster of each zone, the zones joined by closed tie switches'''
+
+        on = closed[self.ties]
+        z = self.tie_zones[on]
+        A = sp.csr_matrix((np.ones(len(z)), (z[:, 0], z[:, 1])), shape=(self.n_zones, self.n_zones))
+        return csgraph.connected_components(A, directed=False)[1]
+
+    def __subnet(self, net: pp.pandapowerNet, zones: tuple) -> dict:
+        '''Subgrid of a set of zones, with the positions of its elements in net'''
+
+        sub = self.__subnets.get(zones)
+        if sub is None:
+            buses = net.bus.index[np.isin(self.bus_zone, zones)]
+            sn = pp.select_subnet(net, buses, include_results=False)
+            sub = {
+                'net':sn,
+                'bus':net.bus.index.get_indexer(sn.bus.index),
+                'line':net.line.index.get_indexer(sn.line.index),
+                'switch':net.switch.index.get_indexer(sn.switch.index),
+                'load':net.load.index.get_indexer(sn.load.index),
+                'radial':None,
+                }
+            self.__subnets[zones] = sub
+        return sub
+
+    def __solve(self, net: pp.pandapowerNet) -> None:
+        '''Solve a grid with the solver, radial falls back to pp.runpp'''
+
+        if self.solver == 'radial':
+            try:
+                if self.__radial is None:
+                    self.__radial = RadialFlow(net)
+                self.__radial.run(net)
+                return
+            except RadialFlowError:
+                pass
+        pp.runpp(net, neglect_open_switch_branches=True)
+
+    def __solve_sub(self, net: pp.pandapowerNet, zones: tuple) -> None:
+        '''Solve the cluster of zones and write its results in the full tables'''
+
+        sub = self.__subnet(net, zones)
+        sn = sub['net']
+        sn.switch['closed'] = net.switch['closed'].values[sub['switch']]
+        sn.load['p_mw'] = net.load['p_mw'].values[sub['load']]
+        sn.load['q_mvar'] = net.load['q_mvar'].values[sub['load']]
+
+        solved = False
+        if self.solver == 'radial':
+            try:
+                if sub['radial'] is None:
+                    sub['radial'] = RadialFlow(sn)
+                sub['radial'].run(sn)
+                solved = True
+            except RadialFlowError:
+                pass
+        if not solved:
+            pp.runpp(sn, neglect_open_switch_branches=True)
+
+        # o radial só calcula parte das colunas do pp.runpp (zona malhada ou
+        # grade inteira resolvida pelo pandapower), as demais ficam NaN
+        for key, pos in (('res_bus', sub['bus']), ('res_line', sub['line'])):
+            values, columns = self.__res[key]
+            values[pos] = sn[key].reindex(columns=columns).values
+
+    def __unsupplied(self, zones: tuple) -> None:
+        '''Results of a cluster without substation (de-energized)'''
+
+        for key, zone_of in (('res_bus', self.bus_zone), ('res_line', self.line_zone)):
+            values, columns = self.__res[key]
+            rows = np.isin(zone_of, zones)
+            values[rows] = np.nan if key == 'res_bus' else 0.0
+
+    def __open_ties(self, closed: np.ndarray, dirty: np.ndarray) -> None:
+        '''Results of the open tie lines next to the solved zones (no flow, voltages of their buses)'''
+
+        k = np.flatnonzero(~closed[self.ties] & dirty[self.tie_zones].any(axis=1))
+        if len(k) == 0:
+            return
+        values, columns = self.__res['res_line']
+        bus, bus_columns = self.__res['res_bus']
+        rows = self.tie_line[k]
+        values[rows] = 0.0
+        for side, end in ((0, 'from'), (1, 'to')):
+            for col in ('vm', 'va'):
+                name = f'{col}_{end}_' + ('pu' if col == 'vm' else 'degree')
+                src = 'vm_pu' if col == 'vm' else 'va_degree'
+                if name in columns and src in bus_columns:
+                    values[rows, columns.get_loc(name)] = bus[self.tie_bus[k, side], bus_columns.get_loc(src)]
+
+        # pandapower não calcula a corrente das linhas com uma barra desenergizada
+        if 'i_from_ka' in columns:
+            off = np.isnan(bus[self.tie_bus[k], bus_columns.get_loc('vm_pu')])
+            values[rows[off[:, 0]], columns.get_loc('i_from_ka')] = np.nan
+            values[rows[off[:, 1]], columns.get_loc('i_to_ka')] = np.nan
+            for name in ('i_ka', 'loading_percent'):
+                values[rows[off.any(axis=1)], columns.get_loc(name)] = np.nan
+
+    def run(self, net: pp.pandapowerNet) -> int:
+        '''
+        Solve the zones changed since the last run and write net.res_bus and net.res_line
+
+        Parameters:
+        :net - pandapowerNet Grid
+
+        Returns:
+        :number of zones solved
+        '''
+
+        closed = net.switch['closed'].values.astype(bool)
+        p = net.load['p_mw'].values
+        q = net.load['q_mvar'].values
+
+        if self.__closed is None or len(closed) != len(self.__closed) or len(p) != len(self.__loads[0]):
+            dirty = np.ones(self.n_zones, dtype=bool)
+        else:
+            dirty = np.zeros(self.n_zones, dtype=bool)
+            sw = np.flatnonzero(closed != self.__closed)
+            dirty[self.switch_zone[sw]] = True
+            # interligação muda as duas zonas
+            tie = np.isin(self.ties, sw)
+            dirty[self.tie_zones[tie].ravel()] = True
+            ld = (p != self.__loads[0]) | (q != self.__loads[1])
+            dirty[self.load_zone[ld]] = True
+
+        cluster = self.clusters(closed)
+        # zonas do mesmo cluster de uma zona alterada
+        dirty = np.isin(cluster, cluster[dirty])
+
+        if self.__res is None or dirty.mean() > self.full_ratio:
+            self.__solve(net)
+            self.__res = {key:(net[key].values.astype(float), net[key].columns) for key in ('res_bus', 'res_line')}
+        elif dirty.any():
+            for c in np.unique(cluster[dirty]):
+                zones = tuple(np.flatnonzero(cluster == c))
+                if self.has_source[list(zones)].any():
+                    self.__solve_sub(net, zones)
+                else:
+                    self.__unsupplied(zones)
+            self.__open_ties(closed, dirty)
+            for key in ('res_bus', 'res_line'):
+                values, columns = self.__res[key]
+                net[key] = pd.DataFrame(values.copy(), index=net[key[4:]].index, columns=columns)
+
+        self.__closed = closed
+        self.__loads = (p.copy(), q.copy())
+        self.solved = int(dirty.sum())
+        return self.solved
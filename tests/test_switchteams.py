@@ -0,0 +1,55 @@
+import os
+import sys
+
+import networkx as nx
+import pandapower as pp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from switchteams import neighbor_teams
+
+SAMPLE = os.path.join(os.path.dirname(__file__), '..', 'sample', 'Circuito01.json')
+
+
+def original_teams(net):
+    '''Neighbor discovery of the first MASHSG.begin (shortest paths from each switch bus)'''
+
+    G = pp.topology.create_nxgraph(net, respect_switches=False)
+    grupos_de = []
+    grupos_para = []
+    for sw_id, sw in net.switch.iterrows():
+        paths = nx.single_source_shortest_path(G, sw['bus'])
+        gd = []
+        gp = []
+        for k in paths:
+            p = paths[k]
+            dp = False
+            for n in range(len(p) - 1):
+                aresta = list(G[p[n]][p[n + 1]].keys())
+                tipo = aresta[0][0]
+                ln_id = aresta[0][1]
+                if tipo != 'line':
+                    continue
+                if ln_id == sw['element']:
+                    dp = True
+                    continue
+                if ln_id in net.switch['element'].values:
+                    sw_v = net.switch.loc[net.switch['element'] == ln_id].index[0]
+                    if dp:
+                        if sw_v not in gp:
+                            gp.append(sw_v)
+                    elif sw_v not in gd:
+                        gd.append(sw_v)
+                    break
+        grupos_de.append(gd)
+        grupos_para.append(gp)
+    return grupos_para, grupos_de
+
+
+def test_teams_match_original_discovery():
+    # mesmas chaves e mesma ordem: a ordem das mensagens no quadro negro depende dela
+    net = pp.from_json(SAMPLE)
+    nb_from, nb_to = neighbor_teams(net)
+    orig_from, orig_to = original_teams(net)
+    assert [list(map(int, g)) for g in nb_from] == [list(map(int, g)) for g in orig_from]
+    assert [list(map(int, g)) for g in nb_to] == [list(map(int, g)) for g in orig_to]
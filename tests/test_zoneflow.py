@@ -0,0 +1,44 @@
+import copy
+import os
+import sys
+
+import numpy as np
+import pandapower as pp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from MASHSG import MASHSG
+from feedergen import feeder_grid
+from zoneflow import ZoneFlow
+
+
+def meshed_feeder_grid():
+    '''Feeder grid with a loop (line without switch) inside the first feeder'''
+
+    net = feeder_grid(n_feeders=4, sections=5)
+    zones = ZoneFlow(net)
+    buses = net.bus.index[zones.bus_zone == zones.bus_zone[0]]
+    pp.create_line(net, int(buses[2]), int(buses[-1]), 0.5, net.line['std_type'].iloc[0])
+    return net
+
+
+def run(net, fault_bus, **kwargs):
+    mas = MASHSG(net=copy.deepcopy(net), headless=True, **kwargs)
+    mas.begin()
+    mas.setFaultBus(faultBus=fault_bus)
+    steps = 0
+    while mas.step() and steps < 100:
+        steps += 1
+    return mas
+
+
+def test_radial_zones_with_meshed_zone():
+    # grade malhada: o fluxo completo cai no pp.runpp, as zonas radiais no RadialFlow
+    net = meshed_feeder_grid()
+    for fault_bus in net.load['bus'].values[::3]:
+        full = run(net, int(fault_bus), solver='radial')
+        zones = run(net, int(fault_bus), solver='radial', zoneFlow=True)
+        assert (full.net.switch['closed'].values == zones.net.switch['closed'].values).all()
+        assert (full.agents.mode == zones.agents.mode).all()
+        assert full.t == zones.t
+        np.testing.assert_allclose(zones.net.res_bus['vm_pu'].values, full.net.res_bus['vm_pu'].values, atol=1e-6)